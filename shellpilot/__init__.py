@@ -10,7 +10,13 @@ __email__ = "raghavyadav1734@gmail.com"
 __description__="AI-powered Linux system Administration CLI"
 
 
-from shellpilot.config import Config
+def __getattr__(name):
+    # Resolved on first access so importing the package (e.g. for
+    # __version__) doesn't pull in pydantic
+    if name == "Config":
+        from shellpilot.config import Config
+        return Config
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 __all__={
     "__version__",
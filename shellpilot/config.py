@@ -3,15 +3,44 @@ Configuration management for ShellPilot
 """
 
 import os
-import json
+import sys
+import tempfile
+import threading
+from contextlib import contextmanager
 from pathlib import Path
-from typing import Optional, Dict, Any
-from pydantic import BaseModel
-from rich.console import Console
-from rich.table import Table
-from dotenv import load_dotenv
+from typing import Optional, Dict, Any, Iterator
+from pydantic import BaseModel, ConfigDict, create_model
+
+from shellpilot.utils.serialization import json_dumps
+
+# Whether .env has already been applied to os.environ
+_dotenv_loaded = False
+
+# Map of environment variables to config keys
+_ENV_MAPPING = {
+    'SHELLPILOT_PROVIDER': 'default_provider',
+    'SHELLPILOT_MODEL': 'default_model',
+    'SHELLPILOT_SAFE_MODE': 'safe_mode',
+    'SHELLPILOT_LOG_LEVEL': 'log_level',
+    'SHELLPILOT_RESPONSE_CACHE': 'response_cache',
+}
+
+# Config keys whose environment values are parsed as booleans
+_BOOL_KEYS = {'safe_mode', 'response_cache'}
+
+# Map of environment variables to API key providers
+_API_KEY_ENV_MAPPING = {
+    'OPENAI_API_KEY': 'openai',
+    'ANTHROPIC_API_KEY': 'anthropic',
+    'GOOGLE_API_KEY': 'gemini',
+    'OLLAMA_API_KEY': 'ollama',
+}
+
+
+def _mask_api_key(key: str) -> str:
+    """Show only the start and end of an API key"""
+    return f"{key[:6]}…{key[-4:]}" if len(key) > 12 else "***"
 
-console = Console()
 
 class Config(BaseModel):
     """Configuration model for ShellPilot"""
@@ -21,6 +50,7 @@ class Config(BaseModel):
     default_model: Optional[str] = None
     safe_mode: bool = True
     log_level: str = "info"
+    response_cache: bool = True  # Reuse LLM answers to identical prompts
 
     # API keys (will be loaded from env/config file)
     api_keys: Dict[str, str] = {}
@@ -30,9 +60,15 @@ class Config(BaseModel):
     config_file: Path = config_dir / "config.json"
     log_file: Path = config_dir / "shellpilot.log"
     history_file: Path = config_dir / "history.json"
+    cache_dir: Path = config_dir / "cache"
+
+    # Pending-write state for batch()
+    _dirty: bool = False
+    _batching: bool = False
+    # Bumped on every change, so cached views of the config can tell
+    _revision: int = 0
 
-    class Config:
-        arbitrary_types_allowed = True
+    model_config = ConfigDict(arbitrary_types_allowed=True)
 
     def __init__(self, **kwargs):
         super().__init__(**kwargs)
@@ -40,6 +76,11 @@ class Config(BaseModel):
         self.load_from_file()
         self.load_from_env()
 
+        # Intern provider names so api_keys lookups by the default provider
+        # hit the identity fast path instead of comparing strings
+        self.default_provider = sys.intern(self.default_provider)
+        self.api_keys = {sys.intern(k): v for k, v in self.api_keys.items()}
+
     def ensure_config_dir(self) -> None:
         """Create config directory if it doesn't exist"""
         self.config_dir.mkdir(exist_ok=True)
@@ -48,44 +89,38 @@ class Config(BaseModel):
         """Load configuration from JSON file"""
         if self.config_file.exists():
             try:
-                with open(self.config_file, 'r') as f:
-                    data = json.load(f)
-                    for key, value in data.items():
-                        if hasattr(self, key):
-                            setattr(self, key, value)
-            except (json.JSONDecodeError, IOError) as e:
+                # Parse and validate in pydantic-core, then copy over only
+                # the fields the file actually sets
+                data = _ConfigFile.model_validate_json(self.config_file.read_bytes())
+                for key in data.model_fields_set:
+                    setattr(self, key, getattr(data, key))
+            except (ValueError, IOError) as e:
+                from shellpilot.ui.console import console
                 console.print(f"[yellow]Warning: Could not load config file: {e}[/yellow]")
 
     def load_from_env(self) -> None:
         """Load configuration from environment variables"""
-        # Load .env file if it exists
-        load_dotenv()
-
-        # Map of environment variables to config keys
-        env_mapping = {
-            'SHELLPILOT_PROVIDER': 'default_provider',
-            'SHELLPILOT_MODEL': 'default_model',
-            'SHELLPILOT_SAFE_MODE': 'safe_mode',
-            'SHELLPILOT_LOG_LEVEL': 'log_level',
-        }
-
-        for env_var, config_key in env_mapping.items():
-            value = os.getenv(env_var)
+        # Load .env file if it exists, once per process
+        global _dotenv_loaded
+        if not _dotenv_loaded:
+            dotenv_path = Path('.env')
+            if dotenv_path.is_file():
+                from dotenv import load_dotenv
+                load_dotenv(dotenv_path)
+            _dotenv_loaded = True
+
+        env = os.environ
+
+        for env_var, config_key in _ENV_MAPPING.items():
+            value = env.get(env_var)
             if value is not None:
-                if config_key == 'safe_mode':
+                if config_key in _BOOL_KEYS:
                     value = value.lower() in ('true', '1', 'yes', 'on')
                 setattr(self, config_key, value)
 
         # Load API keys from environment
-        api_key_mapping = {
-            'OPENAI_API_KEY': 'openai',
-            'ANTHROPIC_API_KEY': 'anthropic',
-            'GOOGLE_API_KEY': 'gemini',
-            'OLLAMA_API_KEY': 'ollama',
-        }
-
-        for env_var, provider in api_key_mapping.items():
-            api_key = os.getenv(env_var)
+        for env_var, provider in _API_KEY_ENV_MAPPING.items():
+            api_key = env.get(env_var)
             if api_key:
                 self.api_keys[provider] = api_key
 
@@ -97,23 +132,60 @@ class Config(BaseModel):
                 'default_model': self.default_model,
                 'safe_mode': self.safe_mode,
                 'log_level': self.log_level,
+                'response_cache': self.response_cache,
                 'api_keys': self.api_keys,
             }
 
-            with open(self.config_file, 'w') as f:
-                json.dump(config_data, f, indent=2)
+            # Write to a temp file and swap it in so a crash never leaves
+            # a truncated config behind. NamedTemporaryFile creates it 0600,
+            # keeping the API keys private, under a name no other save shares
+            tmp_file = tempfile.NamedTemporaryFile(
+                dir=self.config_dir, prefix='.config-', suffix='.tmp', delete=False
+            )
+            try:
+                with tmp_file:
+                    tmp_file.write(json_dumps(config_data, indent=True))
+                os.replace(tmp_file.name, self.config_file)
+            except BaseException:
+                Path(tmp_file.name).unlink(missing_ok=True)
+                raise
+            self._dirty = False
 
         except IOError as e:
+            from shellpilot.ui.console import console
             console.print(f"[red]Error saving config: {e}[/red]")
 
+    @contextmanager
+    def batch(self) -> Iterator["Config"]:
+        """Defer saving until the block exits, writing at most once"""
+        was_batching = self._batching
+        self._batching = True
+        try:
+            yield self
+        finally:
+            self._batching = was_batching
+            if not was_batching and self._dirty:
+                self.save_to_file()
+
+    def _mark_dirty(self) -> None:
+        """Record a change and save it unless inside batch()"""
+        self._revision += 1
+        self._dirty = True
+        if not self._batching:
+            self.save_to_file()
+
+    def get_revision(self) -> int:
+        """Counter that changes whenever a setter or reset() changes the config"""
+        return self._revision
+
     def get_api_key(self, provider: str) -> Optional[str]:
         """Get API key for a specific provider"""
         return self.api_keys.get(provider)
 
     def set_api_key(self, provider: str, api_key: str) -> None:
         """Set API key for a specific provider"""
-        self.api_keys[provider] = api_key
-        self.save_to_file()
+        self.api_keys[sys.intern(provider)] = api_key
+        self._mark_dirty()
 
     def get_default_provider(self) -> str:
         """Get the default LLM provider"""
@@ -121,8 +193,8 @@ class Config(BaseModel):
 
     def set_default_provider(self, provider: str) -> None:
         """Set the default LLM provider"""
-        self.default_provider = provider
-        self.save_to_file()
+        self.default_provider = sys.intern(provider)
+        self._mark_dirty()
 
     def get_default_model(self) -> Optional[str]:
         """Get the default model for current provider"""
@@ -131,7 +203,7 @@ class Config(BaseModel):
     def set_default_model(self, model: str) -> None:
         """Set the default model"""
         self.default_model = model
-        self.save_to_file()
+        self._mark_dirty()
 
     def reset(self) -> None:
         """Reset configuration to defaults"""
@@ -139,7 +211,9 @@ class Config(BaseModel):
         self.default_model = None
         self.safe_mode = True
         self.log_level = "info"
+        self.response_cache = True
         self.api_keys = {}
+        self._revision += 1
 
         # Remove config file
         if self.config_file.exists():
@@ -147,6 +221,10 @@ class Config(BaseModel):
 
     def show(self) -> None:
         """Display current configuration"""
+        # Rich is only needed here, keep it off the import path
+        from rich.table import Table
+        from shellpilot.ui.console import console
+
         table = Table(title="🚁 ShellPilot Configuration")
         table.add_column("Setting", style="cyan")
         table.add_column("Value", style="green")
@@ -177,12 +255,17 @@ class Config(BaseModel):
             "config"
         )
 
+        table.add_row(
+            "Response Cache",
+            "✅ Enabled" if self.response_cache else "❌ Disabled",
+            "config"
+        )
+
         # API keys (masked for security)
         for provider, key in self.api_keys.items():
-            masked_key = f"{key[:8]}{'*' * (len(key) - 8)}" if len(key) > 8 else "***"
             table.add_row(
                 f"{provider.title()} API Key",
-                masked_key,
+                _mask_api_key(key),
                 "environment"
             )
 
@@ -190,15 +273,28 @@ class Config(BaseModel):
         table.add_row("Config Directory", str(self.config_dir), "system")
         table.add_row("Config File", str(self.config_file), "system")
         table.add_row("Log File", str(self.log_file), "system")
+        table.add_row("Cache Directory", str(self.cache_dir), "system")
 
         console.print(table)
 
+# Config's fields as a plain model, for validating the file contents.
+# Pydantic runs a model's own __init__ during validation, and Config's
+# loads the file again, so validating with Config itself would recurse
+_ConfigFile = create_model(
+    "_ConfigFile",
+    __config__=ConfigDict(arbitrary_types_allowed=True),
+    **{name: (field.annotation, field) for name, field in Config.model_fields.items()}
+)
+
 # Global config instance
 _config = None
+_config_lock = threading.Lock()
 
 def get_config() -> Config:
     """Get the global configuration instance"""
     global _config
     if _config is None:
-        _config = Config()
+        with _config_lock:
+            if _config is None:
+                _config = Config()
     return _config
\ No newline at end of file
@@ -5,7 +5,7 @@ Core functionality for ShellPilot
 from .llm import LLMProvider, LLMResponse, LLMManager
 from .safety import SafetyChecker, SafetyResult
 from .executor import CommandExecutor, ExecutionResult
-from .session import SessionStore, SessionCommand, SessionState, get_session_store
+from .session import SessionStore, SessionCommand, SessionState, SessionSnapshot, get_session_store
 from .workflow import WorkflowEngine, Workflow, WorkflowStep, StepStatus, StepType
 
 __all__ = [
@@ -19,6 +19,7 @@ __all__ = [
     "SessionStore",
     "SessionCommand",
     "SessionState",
+    "SessionSnapshot",
     "get_session_store",
     "WorkflowEngine",
     "Workflow",
@@ -0,0 +1,75 @@
+"""
+On-disk cache of LLM responses for ShellPilot
+Identical prompts to the same provider and model are answered locally
+"""
+
+import hashlib
+import os
+import time
+from pathlib import Path
+from typing import Optional
+
+from shellpilot.core.llm import LLMResponse
+from shellpilot.utils.serialization import json_dumps, json_loads
+
+DEFAULT_TTL_DAYS = 7
+
+class ResponseCache:
+    """Content-addressed store of LLM responses, one JSON file per prompt"""
+
+    def __init__(self, cache_dir: Path, ttl_days: int = DEFAULT_TTL_DAYS):
+        self.cache_dir = cache_dir
+        self.ttl_days = ttl_days
+
+    @staticmethod
+    def make_key(provider: str, model: str, prompt: str) -> str:
+        """Hash everything that determines the response"""
+        payload = json_dumps({"model": model, "prompt": prompt, "provider": provider})
+        # blake2b is in the stdlib and outpaces sha256 on 64-bit machines;
+        # 16 bytes is plenty to keep prompts apart
+        return hashlib.blake2b(payload, digest_size=16).hexdigest()
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.json"
+
+    def get(self, key: str) -> Optional[LLMResponse]:
+        """Return the cached response, or None if missing or expired"""
+        path = self._path(key)
+        try:
+            entry = json_loads(path.read_bytes())
+        except (OSError, ValueError):
+            return None
+
+        try:
+            expired = time.time() - entry["created_at"] > entry["ttl_days"] * 86400
+            if not expired:
+                return LLMResponse(**entry["response"])
+        except (KeyError, TypeError):
+            pass
+
+        # Expired or malformed: drop it so it isn't read again
+        try:
+            path.unlink()
+        except OSError:
+            pass
+        return None
+
+    def set(self, key: str, response: LLMResponse) -> None:
+        """Store a response; failures only cost the cache entry"""
+        entry = {
+            "created_at": time.time(),
+            "ttl_days": self.ttl_days,
+            "response": {
+                "content": response.content,
+                "commands": response.commands,
+                "reasoning": response.reasoning,
+                "confidence": response.confidence,
+            },
+        }
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            tmp_file = self._path(key).with_suffix(".tmp")
+            tmp_file.write_bytes(json_dumps(entry))
+            os.replace(tmp_file, self._path(key))
+        except OSError:
+            pass
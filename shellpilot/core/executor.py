@@ -2,20 +2,173 @@
 Command executor for ShellPilot
 """
 
+import errno
+import os
+import re
+import selectors
+import shutil
 import subprocess
 import shlex
-import sys
-from typing import List, Optional, Dict, Any
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterator, List, Optional, Dict, Any, Tuple, Union
 from dataclasses import dataclass
-from rich.console import Console
 from rich.panel import Panel
 from rich.prompt import Confirm, Prompt
 
 from .safety import SafetyChecker, SafetyResult
 
-console = Console()
+from shellpilot.ui.console import console
+from shellpilot.utils.compat import DATACLASS_SLOTS
 
-@dataclass
+# Anything the shell would interpret: pipes, redirects, chaining, subshells,
+# expansions, globs, comments and leading VAR=value assignments
+_SHELL_FEATURES_RE = re.compile(r'[|&;<>()$`*?\[\]{}~!#\n]|^\s*\w+=')
+
+# Builtins and keywords that only work inside a shell. Some also exist as
+# stub executables on PATH (/usr/bin/cd, /usr/bin/command), which can't
+# affect a shell, so they are listed rather than left to the PATH lookup.
+# echo, printf, test, [, kill and pwd do exist as real programs, but they
+# differ from the builtins (escapes, job specs), so they are also listed
+_SHELL_BUILTINS = frozenset({
+    'cd', 'export', 'source', '.', 'alias', 'unalias', 'set', 'unset',
+    'exec', 'eval', 'ulimit', 'umask', 'type', 'hash', 'history',
+    'exit', 'return', 'read', 'wait', 'trap', 'shift', 'getopts',
+    'readonly', 'command', 'times', 'jobs', 'fg', 'bg', 'let', 'local',
+    'declare', 'typeset', 'shopt', 'pushd', 'popd', 'dirs', 'builtin',
+    'break', 'continue', 'disown', 'suspend', 'enable', 'mapfile',
+    'readarray', 'compgen', 'complete', 'fc', 'logout',
+    'echo', 'printf', 'test', '[', 'kill', 'pwd',
+    'if', 'then', 'else', 'elif', 'fi', 'for', 'while', 'until', 'do',
+    'done', 'case', 'esac', 'select', 'function', 'time', 'coproc',
+})
+
+def _split_simple_command(command: str) -> Optional[List[str]]:
+    """Return argv for commands that don't need a shell, else None
+
+    Anything not found on PATH goes to the shell too, so builtins missing
+    from _SHELL_BUILTINS and unknown commands behave as they would there.
+    """
+    if _SHELL_FEATURES_RE.search(command):
+        return None
+    try:
+        argv = shlex.split(command)
+    except ValueError:
+        return None
+    if not argv or argv[0] in _SHELL_BUILTINS or shutil.which(argv[0]) is None:
+        return None
+    return argv
+
+# Programs that only report on the system, whatever their arguments (so
+# not date, hostname, dmesg or env). A batch runs in parallel only
+# when every command in it is one of these; LLM answers are ordered steps,
+# so anything else might depend on the commands before it
+_READ_ONLY_COMMANDS = frozenset({
+    'free', 'df', 'du', 'uptime', 'ps', 'ls', 'cat', 'uname', 'who', 'w',
+    'whoami', 'id', 'groups', 'pwd', 'echo', 'printenv', 'head', 'tail',
+    'wc', 'grep', 'egrep', 'fgrep', 'stat', 'file', 'lsblk', 'lscpu',
+    'lsmem', 'lspci', 'lsusb', 'lsmod', 'lsof', 'nproc', 'arch', 'vmstat',
+    'iostat', 'mpstat', 'netstat', 'ss', 'which', 'whereis', 'last', 'getent',
+})
+
+# Read-only subcommands of programs that can also change state
+_READ_ONLY_SUBCOMMANDS = {
+    'ip': frozenset({'a', 'addr', 'address', 'r', 'route', 'l', 'link'}),
+    'systemctl': frozenset({'status', 'is-active', 'is-enabled', 'list-units'}),
+    'docker': frozenset({'ps', 'images', 'info', 'version'}),
+}
+
+# Redirects, chaining, backgrounding and substitutions; pipes are allowed
+# as long as every stage is read-only
+_UNSAFE_FOR_PARALLEL_RE = re.compile(r'[<>;&`\n]|\$\(')
+
+def _is_read_only(command: str) -> bool:
+    """Whether a command only reads, judged against the allowlists above"""
+    if _UNSAFE_FOR_PARALLEL_RE.search(command):
+        return False
+    for stage in command.split('|'):
+        try:
+            argv = shlex.split(stage)
+        except ValueError:
+            return False
+        if not argv:
+            return False
+        name = argv[0]
+        if name in _READ_ONLY_COMMANDS:
+            continue
+        subcommands = _READ_ONLY_SUBCOMMANDS.get(name)
+        if subcommands is None or len(argv) < 2 or argv[1] not in subcommands:
+            return False
+        # "ip addr add ..." changes state; only bare or "show"/"list" forms pass
+        if name == 'ip' and len(argv) > 2 and argv[2] not in ('show', 'list'):
+            return False
+    return True
+
+# Upper bound on commands running at once in a parallel batch
+_MAX_PARALLEL_COMMANDS = 8
+
+# Keep at most the last 1 MiB of each output stream
+MAX_CAPTURE_BYTES = 1024 * 1024
+
+def _run_streaming(
+    args: Union[str, List[str]],
+    shell: bool,
+    timeout: int,
+    max_bytes: int = MAX_CAPTURE_BYTES
+) -> Tuple[int, str, str]:
+    """Run a process, reading stdout/stderr incrementally into bounded buffers"""
+    with subprocess.Popen(
+        args,
+        shell=shell,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE
+    ) as process:
+        buffers = {process.stdout: bytearray(), process.stderr: bytearray()}
+        truncated = set()
+        deadline = time.monotonic() + timeout
+
+        with selectors.DefaultSelector() as selector:
+            for stream in buffers:
+                selector.register(stream, selectors.EVENT_READ)
+
+            while selector.get_map():
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    process.kill()
+                    raise subprocess.TimeoutExpired(args, timeout)
+
+                for key, _ in selector.select(remaining):
+                    chunk = os.read(key.fd, 65536)
+                    if not chunk:
+                        selector.unregister(key.fileobj)
+                        continue
+
+                    buffer = buffers[key.fileobj]
+                    buffer += chunk
+                    # Trim lazily so we don't shift the buffer on every read
+                    if len(buffer) > 2 * max_bytes:
+                        del buffer[:-max_bytes]
+                        truncated.add(key.fileobj)
+
+        try:
+            returncode = process.wait(timeout=max(deadline - time.monotonic(), 0))
+        except subprocess.TimeoutExpired:
+            process.kill()
+            raise
+
+    def _decode(stream) -> str:
+        buffer = buffers[stream]
+        if len(buffer) > max_bytes:
+            del buffer[:-max_bytes]
+            truncated.add(stream)
+        text = buffer.decode(errors="replace")
+        if stream in truncated:
+            text = "[... output truncated ...]\n" + text
+        return text
+
+    return returncode, _decode(process.stdout), _decode(process.stderr)
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class ExecutionResult:
     """Result of command execution"""
     command: str
@@ -35,8 +188,7 @@ class CommandExecutor:
 
     def execute_single(self, command: str, timeout: int = 30) -> ExecutionResult:
         """Execute a single command"""
-        import time
-        start_time = time.time()
+        start_time = time.perf_counter()
 
         # Safety check
         safety_result = self.safety_checker.check_command(command)
@@ -48,7 +200,7 @@ class CommandExecutor:
                 exit_code=-1,
                 stdout="",
                 stderr=f"Command blocked for safety: {safety_result.reason}",
-                execution_time=time.time() - start_time
+                execution_time=time.perf_counter() - start_time
             )
 
         # Show warnings if any
@@ -64,7 +216,7 @@ class CommandExecutor:
                 exit_code=-2,
                 stdout="",
                 stderr="Command cancelled by user",
-                execution_time=time.time() - start_time
+                execution_time=time.perf_counter() - start_time
             )
 
         # Dry run mode
@@ -76,32 +228,45 @@ class CommandExecutor:
                 exit_code=0,
                 stdout=f"[DRY RUN] Command: {command}",
                 stderr="",
-                execution_time=time.time() - start_time
+                execution_time=time.perf_counter() - start_time
             )
 
         # Execute the command
         try:
-            # Use shell=True carefully with shlex.quote for safety
-            quoted_command = shlex.quote(command) if not command.startswith('sudo') else command
-
-            process = subprocess.run(
-                command,
-                shell=True,
-                capture_output=True,
-                text=True,
-                timeout=timeout,
-                check=False  # Don't raise on non-zero exit
-            )
+            # Spawn simple commands directly, only go through /bin/sh
+            # when the command actually uses shell syntax
+            argv = _split_simple_command(command)
+            if argv is not None:
+                try:
+                    returncode, stdout, stderr = _run_streaming(argv, shell=False, timeout=timeout)
+                except OSError as e:
+                    # Not executable, or a script without a #! line: let the
+                    # shell run it or report it the way it normally would
+                    if not isinstance(e, PermissionError) and e.errno != errno.ENOEXEC:
+                        raise
+                    argv = None
+            if argv is None:
+                returncode, stdout, stderr = _run_streaming(command, shell=True, timeout=timeout)
 
             return ExecutionResult(
                 command=command,
-                success=process.returncode == 0,
-                exit_code=process.returncode,
-                stdout=process.stdout,
-                stderr=process.stderr,
-                execution_time=time.time() - start_time
+                success=returncode == 0,
+                exit_code=returncode,
+                stdout=stdout,
+                stderr=stderr,
+                execution_time=time.perf_counter() - start_time
             )
 
+        except FileNotFoundError:
+            # Mirror the shell's "command not found" status for direct spawns
+            return ExecutionResult(
+                command=command,
+                success=False,
+                exit_code=127,
+                stdout="",
+                stderr=f"{command.split()[0]}: command not found",
+                execution_time=time.perf_counter() - start_time
+            )
         except subprocess.TimeoutExpired:
             return ExecutionResult(
                 command=command,
@@ -118,28 +283,53 @@ class CommandExecutor:
                 exit_code=-4,
                 stdout="",
                 stderr=f"Execution error: {str(e)}",
-                execution_time=time.time() - start_time
+                execution_time=time.perf_counter() - start_time
             )
 
-    def execute_multiple(self, commands: List[str]) -> List[ExecutionResult]:
-        """Execute multiple commands in sequence"""
-        results = []
+    def can_run_parallel(self, commands: List[str]) -> bool:
+        """Whether a batch may run concurrently without changing its outcome
+
+        Only when nothing prompts for approval or stops the batch on failure
+        (safe mode does both) and every command is known to be read-only.
+        """
+        return (
+            not self.safe_mode
+            and len(commands) > 1
+            and all(_is_read_only(cmd) for cmd in commands)
+        )
+
+    def execute_multiple(self, commands: List[str], parallel: bool = False) -> List[ExecutionResult]:
+        """Execute multiple commands in sequence
 
+        With parallel=True, a batch that can_run_parallel() allows runs
+        concurrently; output is still shown in command order once all finish.
+        """
+        if parallel and self.can_run_parallel(commands):
+            with ThreadPoolExecutor(max_workers=min(len(commands), _MAX_PARALLEL_COMMANDS)) as pool:
+                results = list(pool.map(self.execute_single, commands))
+
+            for result in results:
+                console.print(f"\n[cyan]Executing:[/cyan] {result.command}")
+                self._display_result(result)
+            return results
+
+        return list(self.iter_execute(commands))
+
+    def iter_execute(self, commands: List[str]) -> Iterator[ExecutionResult]:
+        """Execute commands in sequence, yielding each result as it finishes"""
         for command in commands:
             console.print(f"\n[cyan]Executing:[/cyan] {command}")
             result = self.execute_single(command)
-            results.append(result)
 
             # Display result
             self._display_result(result)
+            yield result
 
             # Stop on failure if in safe mode
             if not result.success and self.safe_mode:
                 console.print("[red]❌ Stopping execution due to failure[/red]")
                 break
 
-        return results
-
     def _get_user_approval(self, command: str, safety_result: SafetyResult) -> bool:
         """Get user approval for command execution"""
         if safety_result.risk_level == "critical":
@@ -2,15 +2,42 @@
 LLM Provider base class and utilities for ShellPilot
 """
 
+import asyncio
+import functools
+import importlib
 import re
+from concurrent.futures import ThreadPoolExecutor
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional, List
+from typing import Callable, Dict, Any, Optional, List, Tuple, Type
 from dataclasses import dataclass
-from rich.console import Console
 
-console = Console()
-
-@dataclass
+from shellpilot.ui.console import console
+from shellpilot.utils.compat import DATACLASS_SLOTS
+
+_BASH_BLOCK_RE = re.compile(r'```(?:bash|shell|sh)?\n(.*?)\n```', re.DOTALL | re.IGNORECASE)
+
+_COMMON_CMDS = (
+    'sudo', 'apt', 'yum', 'systemctl', 'docker', 'git', 'ls', 'cd', 'cp', 'mv',
+    'rm', 'chmod', 'chown', 'ps', 'top', 'grep', 'find', 'curl', 'wget',
+)
+
+_DANGEROUS_PATTERNS = [
+    re.compile(p, re.IGNORECASE)
+    for p in (
+        r'rm\s+-rf\s+/',
+        r'dd\s+if=',
+        r'mkfs',
+        r'fdisk.*-.*',
+        r'format',
+        r'>>\s*/dev/null',
+        r':\(\)\{.*\|\&\}',  # Fork bomb pattern
+    )
+]
+
+# Literals at least one of which must appear for any dangerous pattern to match
+_DANGEROUS_TOKENS = ('rm', 'if=', 'mkfs', 'fdisk', 'format', '/dev/null', ':(){')
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class LLMResponse:
     """Response from LLM provider"""
     content: str
@@ -40,6 +67,36 @@ class LLMProvider(ABC):
         """Validate provider configuration (API key, connectivity, etc.)"""
         pass
 
+    def generate_command_stream(self, query: str, on_text: Callable[[str], None]) -> LLMResponse:
+        """Like generate_command, calling on_text with the text received so far
+
+        Providers that can't stream deliver the whole text once at the end.
+        """
+        response = self.generate_command(query)
+        on_text(response.content)
+        return response
+
+    async def agenerate_command(self, query: str) -> LLMResponse:
+        """Async generate_command, for callers running on an event loop
+
+        Providers without an async client run the blocking call on the
+        loop's default executor so the loop stays free meanwhile.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self.generate_command, query)
+
+    async def aclose(self) -> None:
+        """Close clients opened by agenerate_command"""
+        pass
+
+    def warm_up(self) -> None:
+        """Start opening a connection ahead of the first request
+
+        Must return immediately. Providers without a reusable client keep
+        this no-op.
+        """
+        pass
+
     def get_system_prompt(self) -> str:
         """Get the system prompt for Linux command generation"""
         return """You are ShellPilot, an AI assistant that helps users with Linux system administration.
@@ -74,8 +131,7 @@ This displays memory usage in human-readable format."
         commands = []
 
         # Look for code blocks with bash/shell
-        bash_pattern = r'```(?:bash|shell|sh)?\n(.*?)\n```'
-        matches = re.findall(bash_pattern, content, re.DOTALL | re.IGNORECASE)
+        matches = _BASH_BLOCK_RE.findall(content)
 
         for match in matches:
             # Split by lines and clean up
@@ -88,12 +144,11 @@ This displays memory usage in human-readable format."
 
         # If no code blocks found, look for lines starting with common commands
         if not commands:
-            common_commands = ['sudo', 'apt', 'yum', 'systemctl', 'docker', 'git', 'ls', 'cd', 'cp', 'mv', 'rm', 'chmod', 'chown', 'ps', 'top', 'grep', 'find', 'curl', 'wget']
             lines = content.split('\n')
 
             for line in lines:
                 line = line.strip()
-                if any(line.startswith(cmd) for cmd in common_commands):
+                if line.startswith(_COMMON_CMDS):
                     commands.append(line)
 
         return commands
@@ -101,19 +156,15 @@ This displays memory usage in human-readable format."
     def _validate_commands(self, commands: List[str]) -> List[str]:
         """Basic validation and filtering of commands"""
         safe_commands = []
-        dangerous_patterns = [
-            r'rm\s+-rf\s+/',
-            r'dd\s+if=',
-            r'mkfs',
-            r'fdisk.*-.*',
-            r'format',
-            r'>>\s*/dev/null',
-            r':\(\)\{.*\|\&\}',  # Fork bomb pattern
-        ]
 
         for cmd in commands:
-            # Check for dangerous patterns
-            is_dangerous = any(re.search(pattern, cmd, re.IGNORECASE) for pattern in dangerous_patterns)
+            # Check for dangerous patterns, skipping the regexes when no
+            # dangerous literal is present at all
+            lowered = cmd.lower()
+            is_dangerous = (
+                any(token in lowered for token in _DANGEROUS_TOKENS)
+                and any(pattern.search(cmd) for pattern in _DANGEROUS_PATTERNS)
+            )
 
             if not is_dangerous:
                 safe_commands.append(cmd)
@@ -122,12 +173,45 @@ This displays memory usage in human-readable format."
 
         return safe_commands
 
+# Provider name -> (module, class name, default model, extra constructor kwargs)
+_PROVIDER_REGISTRY: Dict[str, Tuple[str, str, str, Dict[str, Any]]] = {
+    "deepseek": ("shellpilot.providers.deepseek", "DeepSeekProvider", "deepseek/deepseek-chat", {}),
+    "openai": ("shellpilot.providers.openai", "OpenAIProvider", "gpt-4", {}),
+    "anthropic": ("shellpilot.providers.anthropic", "AnthropicProvider", "claude-3-sonnet-20240229", {}),
+    "ollama": ("shellpilot.providers.ollama", "OllamaProvider", "llama2", {"base_url": "http://localhost:11434"}),
+}
+
+@functools.lru_cache(maxsize=None)
+def _load_provider_class(provider_name: str) -> Type[LLMProvider]:
+    """Import and return the provider class, resolving each name only once"""
+    module_name, class_name, _, _ = _PROVIDER_REGISTRY[provider_name]
+    return getattr(importlib.import_module(module_name), class_name)
+
+# Upper bound on provider requests in flight for one batch
+_MAX_BATCH_WORKERS = 4
+
+# Providers built so far, keyed by (name, model, api key). Shared across
+# LLMManager instances so SDK clients and their connection pools outlive a
+# single command or web request
+_PROVIDER_CACHE: Dict[Tuple[str, str, str], LLMProvider] = {}
+
+# Async requests currently waiting on a provider, keyed by (provider, model,
+# prompt). An identical request arriving meanwhile awaits the same task
+# instead of asking again
+_INFLIGHT: Dict[Tuple[str, str, str], "asyncio.Task[LLMResponse]"] = {}
+
+async def aclose_providers() -> None:
+    """Close the async clients of every cached provider, e.g. at server shutdown"""
+    for provider in list(_PROVIDER_CACHE.values()):
+        await provider.aclose()
+
 class LLMManager:
     """Manager class to handle different LLM providers"""
 
     def __init__(self, config):
         self.config = config
         self._provider = None
+        self._cache = None
 
     def get_provider(self) -> LLMProvider:
         """Get the appropriate LLM provider based on config"""
@@ -138,48 +222,141 @@ class LLMManager:
             if not api_key:
                 raise ValueError(f"No API key found for provider: {provider_name}")
 
-            # Import and create provider
-            if provider_name == "deepseek":
-                from shellpilot.providers.deepseek import DeepSeekProvider
-                self._provider = DeepSeekProvider(
-                    api_key=api_key,
-                    model=self.config.get_default_model() or "deepseek/deepseek-chat"
-                )
-            elif provider_name == "openai":
-                from shellpilot.providers.openai import OpenAIProvider
-                self._provider = OpenAIProvider(
-                    api_key=api_key,
-                    model=self.config.get_default_model() or "gpt-4"
-                )
-            elif provider_name == "anthropic":
-                from shellpilot.providers.anthropic import AnthropicProvider
-                self._provider = AnthropicProvider(
+            if provider_name not in _PROVIDER_REGISTRY:
+                raise ValueError(f"Unknown provider: {provider_name}")
+
+            # Reuse an existing provider or import and create one
+            _, _, default_model, extra_kwargs = _PROVIDER_REGISTRY[provider_name]
+            model = self.config.get_default_model() or default_model
+            key = (provider_name, model, api_key)
+            provider = _PROVIDER_CACHE.get(key)
+            if provider is None:
+                provider_class = _load_provider_class(provider_name)
+                # A concurrent miss may build a second one; the last stored wins
+                provider = _PROVIDER_CACHE[key] = provider_class(
                     api_key=api_key,
-                    model=self.config.get_default_model() or "claude-3-sonnet-20240229"
+                    model=model,
+                    **extra_kwargs
                 )
-            elif provider_name == "ollama":
-                from shellpilot.providers.ollama import OllamaProvider
-                self._provider = OllamaProvider(
-                    api_key=api_key or "none",  # Ollama doesn't need API key
-                    model=self.config.get_default_model() or "llama2",
-                    base_url="http://localhost:11434"
-                )
-            else:
-                raise ValueError(f"Unknown provider: {provider_name}")
+            self._provider = provider
 
         return self._provider
 
-    def generate_command(self, query: str, context: Optional[str] = None) -> LLMResponse:
-        """Generate command using the configured provider with optional context"""
-        provider = self.get_provider()
-
-        # Add context to the query if provided
+    def _enhance_query(self, query: str, context: Optional[str]) -> str:
+        """Add context to the query if provided"""
         if context:
-            enhanced_query = f"{context}\n\nNew Request: {query}"
+            return f"{context}\n\nNew Request: {query}"
+        return query
+
+    def _cache_key(self, provider: LLMProvider, enhanced_query: str) -> Optional[str]:
+        """Response cache key for the query, or None with the cache turned off"""
+        if not self.config.response_cache:
+            return None
+
+        if self._cache is None:
+            from shellpilot.core.cache import ResponseCache
+            self._cache = ResponseCache(self.config.cache_dir)
+
+        return self._cache.make_key(
+            self.config.get_default_provider(), provider.model, enhanced_query
+        )
+
+    def _cached_response(self, key: Optional[str], use_cache: bool) -> Optional[LLMResponse]:
+        if key is None or not use_cache:
+            return None
+        cached = self._cache.get(key)
+        if cached is not None:
+            console.print("[dim]📦 Using cached response[/dim]")
+        return cached
+
+    def _store_response(self, key: Optional[str], response: LLMResponse) -> None:
+        # Providers report failures as responses without commands; only
+        # keep real answers
+        if key is not None and response.commands:
+            self._cache.set(key, response)
+
+    def generate_command(
+        self,
+        query: str,
+        context: Optional[str] = None,
+        use_cache: bool = True,
+        on_text: Optional[Callable[[str], None]] = None
+    ) -> LLMResponse:
+        """Generate command using the configured provider with optional context
+
+        use_cache=False asks the provider even when a cached answer exists,
+        and still stores the fresh one. on_text, if given, streams the
+        response and receives the text so far as it arrives; cached answers
+        are returned without calling it.
+        """
+        provider = self.get_provider()
+        enhanced_query = self._enhance_query(query, context)
+
+        key = self._cache_key(provider, enhanced_query)
+        cached = self._cached_response(key, use_cache)
+        if cached is not None:
+            return cached
+
+        # Only now is a request certain; cached answers and dry runs
+        # shouldn't touch the network
+        provider.warm_up()
+        if on_text is None:
+            response = provider.generate_command(enhanced_query)
         else:
-            enhanced_query = query
+            response = provider.generate_command_stream(enhanced_query, on_text)
+        self._store_response(key, response)
+        return response
+
+    async def agenerate_command(
+        self,
+        query: str,
+        context: Optional[str] = None,
+        use_cache: bool = True
+    ) -> LLMResponse:
+        """generate_command for async callers such as the web API
+
+        Identical requests made while one is still waiting on the provider
+        share its answer, unless use_cache=False asks for a fresh one.
+        """
+        provider = self.get_provider()
+        enhanced_query = self._enhance_query(query, context)
+
+        key = self._cache_key(provider, enhanced_query)
+        cached = self._cached_response(key, use_cache)
+        if cached is not None:
+            return cached
 
-        return provider.generate_command(enhanced_query)
+        if not use_cache:
+            response = await provider.agenerate_command(enhanced_query)
+        else:
+            inflight_key = (self.config.get_default_provider(), provider.model, enhanced_query)
+            task = _INFLIGHT.get(inflight_key)
+            if task is None:
+                task = asyncio.ensure_future(provider.agenerate_command(enhanced_query))
+                _INFLIGHT[inflight_key] = task
+                task.add_done_callback(lambda _: _INFLIGHT.pop(inflight_key, None))
+            # Shielded so one caller going away doesn't cancel the others' request
+            response = await asyncio.shield(task)
+
+        self._store_response(key, response)
+        return response
+
+    def generate_commands_batch(
+        self, queries: List[str], context: Optional[str] = None
+    ) -> List[LLMResponse]:
+        """Generate commands for independent queries concurrently
+
+        No provider has a batch endpoint, so requests are overlapped on
+        threads instead; they share the provider's pooled connections.
+        Results come back in query order.
+        """
+        if len(queries) <= 1:
+            return [self.generate_command(query, context) for query in queries]
+
+        # Resolve the provider once up front rather than in every worker
+        self.get_provider()
+        with ThreadPoolExecutor(max_workers=min(len(queries), _MAX_BATCH_WORKERS)) as pool:
+            return list(pool.map(lambda query: self.generate_command(query, context), queries))
 
     def test_connection(self) -> bool:
         """Test if the provider is working"""
@@ -0,0 +1,49 @@
+"""
+Prompts shared by the CLI and the web API
+"""
+
+from typing import Optional
+
+# Planning instructions for workflow requests. They come before the task
+# and context so every request starts with the same bytes, which lets
+# providers reuse their cached prefix
+WORKFLOW_PROMPT_PREFIX = """
+MULTI-STEP WORKFLOW PLANNING:
+
+Please create a comprehensive step-by-step plan for the complex task given at the end. Structure your response with clear phases:
+
+### Step 1: [Phase Name]
+Brief description of what this phase accomplishes.
+```bash
+command1
+command2
+```
+
+### Step 2: [Phase Name]
+Brief description of what this phase accomplishes.
+```bash
+command3
+command4
+```
+
+Important considerations:
+1. Break down into logical, sequential phases
+2. Each step should have clear dependencies
+3. Include verification commands where appropriate
+4. Consider error handling and rollback scenarios
+5. Use safe, standard Linux practices
+6. Include explanations for complex operations
+"""
+
+_NO_SESSION_CONTEXT = "No previous session context."
+
+def build_workflow_prompt(query: str, context: Optional[str]) -> str:
+    """Workflow planning prompt for a task and the session's context summary"""
+    if not context or "No previous commands" in context:
+        context = _NO_SESSION_CONTEXT
+    return WORKFLOW_PROMPT_PREFIX + f"""
+Task: {query}
+
+Context from recent session:
+{context}
+"""
@@ -3,14 +3,14 @@ Safety checker for validating commands before execution
 """
 
 import re
-import shlex
-from typing import List, Set, Dict, Optional
+from typing import List, Set, Dict, Optional, Pattern
 from dataclasses import dataclass
-from rich.console import Console
 
-console = Console()
+from shellpilot.utils.compat import DATACLASS_SLOTS
 
-@dataclass
+_CURL_PIPE_SH_RE = re.compile(r'curl.*\|.*sh')
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
 class SafetyResult:
     """Result of safety check"""
     is_safe: bool
@@ -24,8 +24,13 @@ class SafetyChecker:
     def __init__(self, safe_mode: bool = True):
         self.safe_mode = safe_mode
         self.blocked_commands = self._get_blocked_commands()
+        self._normalized_blocked = {self._normalize(c) for c in self.blocked_commands}
+        self._blocked_re = self._compile_blocked(self._normalized_blocked)
         self.high_risk_patterns = self._get_high_risk_patterns()
         self.medium_risk_patterns = self._get_medium_risk_patterns()
+        # One alternation per tier so each check scans the command once
+        self._high_risk_re = self._combine_patterns(self.high_risk_patterns, "h")
+        self._medium_risk_re = self._combine_patterns(self.medium_risk_patterns, "m")
 
     def _get_blocked_commands(self) -> Set[str]:
         """Commands that are completely blocked"""
@@ -39,9 +44,9 @@ class SafetyChecker:
             "parted /dev/sda",
         }
 
-    def _get_high_risk_patterns(self) -> List[str]:
+    def _get_high_risk_patterns(self) -> List[Pattern[str]]:
         """Regex patterns for high-risk commands"""
-        return [
+        patterns = [
             r'rm\s+-rf\s+/',  # Recursive delete from root
             r'dd\s+if=/dev/(?:zero|random)\s+of=/dev/(?:sd[a-z]|hd[a-z])',  # Disk overwrite
             r'mkfs\.\w+\s+/dev/',  # Format filesystem
@@ -53,10 +58,11 @@ class SafetyChecker:
             r'curl.*\|\s*(?:bash|sh)',  # Pipe curl to shell
             r'wget.*\|\s*(?:bash|sh)',  # Pipe wget to shell
         ]
+        return [re.compile(p, re.IGNORECASE) for p in patterns]
 
-    def _get_medium_risk_patterns(self) -> List[str]:
+    def _get_medium_risk_patterns(self) -> List[Pattern[str]]:
         """Regex patterns for medium-risk commands"""
-        return [
+        patterns = [
             r'sudo\s+rm\s+-rf',  # Recursive delete with sudo
             r'rm\s+-rf\s+\S+',  # Any recursive delete
             r'chmod\s+[0-7]{3}\s+/',  # Permission change on root
@@ -67,14 +73,44 @@ class SafetyChecker:
             r'userdel\s+',  # Delete user
             r'groupdel\s+',  # Delete group
         ]
+        return [re.compile(p, re.IGNORECASE) for p in patterns]
+
+    @staticmethod
+    def _normalize(command: str) -> str:
+        """Collapse whitespace and drop trailing separators"""
+        return " ".join(command.split()).rstrip("; ")
+
+    @staticmethod
+    def _compile_blocked(blocked: Set[str]) -> Pattern[str]:
+        """Match blocked commands anywhere they appear as a whole command"""
+        alternation = "|".join(
+            re.escape(c) for c in sorted(blocked, key=len, reverse=True)
+        )
+        # Bounded by start/end or shell separators, so "sudo rm -rf /" is
+        # caught but "rm -rf /tmp/x" is not
+        return re.compile(rf"(?<![^\s;&|(])(?:{alternation})(?![^\s;&|)])")
+
+    @staticmethod
+    def _combine_patterns(patterns: List[Pattern[str]], prefix: str) -> Pattern[str]:
+        """Fuse patterns into one alternation with a named group per pattern"""
+        return re.compile(
+            "|".join(f"(?P<{prefix}{i}>{p.pattern})" for i, p in enumerate(patterns)),
+            re.IGNORECASE
+        )
 
     def check_command(self, command: str) -> SafetyResult:
         """Check if a command is safe to execute"""
+        return self._check(command)
+
+    def _check(self, command: str, check_patterns: bool = True) -> SafetyResult:
+        """Run the safety checks, optionally skipping the risk-pattern scans"""
         command = command.strip()
         warnings = []
 
-        # Check blocked commands
-        if command in self.blocked_commands:
+        # Check blocked commands: exact hit on the normalized form first,
+        # then ones embedded in a longer line
+        normalized = self._normalize(command)
+        if normalized in self._normalized_blocked or self._blocked_re.search(normalized):
             return SafetyResult(
                 is_safe=False,
                 risk_level="critical",
@@ -83,22 +119,22 @@ class SafetyChecker:
             )
 
         # Check high-risk patterns
-        for pattern in self.high_risk_patterns:
-            if re.search(pattern, command, re.IGNORECASE):
-                if self.safe_mode:
-                    return SafetyResult(
-                        is_safe=False,
-                        risk_level="high",
-                        warnings=[f"High-risk command detected: {pattern}"],
-                        reason="Matches high-risk pattern"
-                    )
-                else:
-                    warnings.append(f"⚠️  High-risk command: {command}")
+        match = self._high_risk_re.search(command) if check_patterns else None
+        if match:
+            if self.safe_mode:
+                pattern = self.high_risk_patterns[int(match.lastgroup[1:])]
+                return SafetyResult(
+                    is_safe=False,
+                    risk_level="high",
+                    warnings=[f"High-risk command detected: {pattern.pattern}"],
+                    reason="Matches high-risk pattern"
+                )
+            else:
+                warnings.append(f"⚠️  High-risk command: {command}")
 
         # Check medium-risk patterns
-        for pattern in self.medium_risk_patterns:
-            if re.search(pattern, command, re.IGNORECASE):
-                warnings.append(f"⚠️  Medium-risk command: {command}")
+        if check_patterns and self._medium_risk_re.search(command):
+            warnings.append(f"⚠️  Medium-risk command: {command}")
 
         # Additional checks
         warnings.extend(self._additional_checks(command))
@@ -126,7 +162,7 @@ class SafetyChecker:
             warnings.append("⚠️  Using sudo with rm - be careful!")
 
         # Check for network commands that could be dangerous
-        if re.search(r'curl.*\|.*sh', command):
+        if _CURL_PIPE_SH_RE.search(command):
             warnings.append("⚠️  Piping network content to shell - verify source!")
 
         # Check for permission changes
@@ -143,12 +179,17 @@ class SafetyChecker:
 
     def validate_command_list(self, commands: List[str]) -> Dict[str, SafetyResult]:
         """Validate a list of commands"""
-        results = {}
-
-        for i, command in enumerate(commands):
-            results[f"command_{i}"] = self.check_command(command)
+        # Screen the whole batch in one pass per tier; if nothing fires, the
+        # per-command pattern scans can be skipped entirely
+        batch = "\n".join(commands)
+        check_patterns = bool(
+            self._high_risk_re.search(batch) or self._medium_risk_re.search(batch)
+        )
 
-        return results
+        return {
+            f"command_{i}": self._check(command, check_patterns)
+            for i, command in enumerate(commands)
+        }
 
     def is_safe_to_execute(self, command: str) -> bool:
         """Simple boolean check if command is safe"""
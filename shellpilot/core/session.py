@@ -3,18 +3,24 @@ Session management for ShellPilot.
 Tracks commands, context, and state across interactions
 """
 
-import json
+import atexit
+import mmap
 import os
-from datetime import datetime, timedelta
+import sys
+import threading
+import time
+from collections import deque
+from datetime import datetime
+from itertools import islice
 from pathlib import Path
-from typing import List,Dict, Any, Optional
+from typing import List,Dict, Any, Optional, Tuple, Deque
 from dataclasses import dataclass, asdict
-from rich.console import Console
 
-console = Console()
+from shellpilot.utils.compat import DATACLASS_SLOTS
+from shellpilot.utils.serialization import json_dumps, json_loads
 
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class SessionCommand:
     """Represents a command executed in the session"""
     timestamp: str
@@ -24,8 +30,9 @@ class SessionCommand:
     success: bool
     ai_summary: Optional[str] = None
     execution_time: float = 0.0
+    kind: str = ""  # "workflow" or "standard"; see _command_kind
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class SessionState:
     """Current session state"""
     session_id: str
@@ -33,69 +40,278 @@ class SessionState:
     current_working_dir: str
     total_commands: int
     last_updated: str
-    commands_history: List[SessionCommand]
+    commands_history: Deque[SessionCommand]
+
+@dataclass(frozen=True, **DATACLASS_SLOTS)
+class SessionSnapshot:
+    """What a single CLI command needs from the session, read once"""
+    session_id: str
+    total_commands: int
+    recent_commands: List[SessionCommand]
+    context_summary: str
+
+# Below this size a plain read is cheaper than setting up a mapping
+_MMAP_MIN_SIZE = 64 * 1024
+
+# Commands shorter than this are interned; longer ones rarely repeat
+_INTERN_MAX_LEN = 32
+
+def _command_kind(query: str) -> str:
+    """Classify a command by its query, for entries recorded without a kind"""
+    return "workflow" if "WORKFLOW" in query else "standard"
+
+def _intern_command(cmd: SessionCommand) -> SessionCommand:
+    """Share the strings that repeat across history entries"""
+    # Entries logged before kinds were stored get theirs once, on load
+    cmd.kind = sys.intern(cmd.kind or _command_kind(cmd.query))
+    cmd.working_dir = sys.intern(cmd.working_dir)
+    cmd.commands = [
+        sys.intern(c) if len(c) < _INTERN_MAX_LEN else c for c in cmd.commands
+    ]
+    return cmd
+
+# One history line in get_context_summary, with its template parsed once
+_CONTEXT_LINE = "{}. {} '{}' -> {}{}".format
+
+# Budget for the context summary sent with each prompt, estimated at four
+# characters per token; the oldest commands are dropped to stay within it
+_CONTEXT_MAX_TOKENS = 1500
+_CHARS_PER_TOKEN = 4
+
+# Queries and summaries longer than this are clipped in the context summary
+_CONTEXT_FIELD_MAX_CHARS = 300
+
+def _clip(text: str, limit: int = _CONTEXT_FIELD_MAX_CHARS) -> str:
+    return text if len(text) <= limit else text[:limit - 3] + "..."
+
+# Minimum seconds between background writes while commands keep arriving
+_FLUSH_INTERVAL = 2.0
 
 class SessionStore:
     """Manages session state and persistence"""
 
     def __init__(self, session_file: Optional[Path] = None):
         self.session_file = session_file or Path.home() / ".shellpilot" / "session.json"
+        # Commands are appended one per line here; session_file only holds metadata
+        self.log_file = self.session_file.with_suffix(".jsonl")
         self.session_file.parent.mkdir(parents=True, exist_ok=True)
         self.max_history = 50  # Keep last 50 commands
+        self._log_lines = 0  # Lines currently in log_file, for compaction
+        # Raw log lines not yet turned into SessionCommands, see _history()
+        self._unparsed_history: Optional[Deque[bytes]] = None
+        # Commands added since the last flush, written out together
+        self._pending_log: List[SessionCommand] = []
+        self._dirty = False
+        # Guards the in-memory state shared with the background writer
+        self._lock = threading.RLock()
+        self._wakeup = threading.Event()
+        self._writer: Optional[threading.Thread] = None
         self._session_state = self._load_session()
+        atexit.register(self.flush)
 
     def _load_session(self) -> SessionState:
         """Load session from file or create new one"""
         if self.session_file.exists():
             try:
-                with open(self.session_file, 'r') as f:
-                    data = json.load(f)
+                data = json_loads(self.session_file.read_bytes())
 
-                # Convert command dictionaries back to SessionCommand objects
-                commands = [
-                    SessionCommand(**cmd) for cmd in data.get('commands_history', [])
-                ]
+                if 'commands_history' in data:
+                    # Older single-file format: migrate history into the log
+                    commands = [
+                        _intern_command(SessionCommand(**cmd))
+                        for cmd in data['commands_history']
+                    ]
+                    rewrite = True
+                else:
+                    # Only the raw lines are read here; parsing them waits
+                    # until something actually needs the history
+                    commands = []
+                    self._unparsed_history, clean = self._load_log()
+                    rewrite = not clean
 
-                return SessionState(
+                state = SessionState(
                     session_id=data.get('session_id', self._generate_session_id()),
                     start_time=data.get('start_time', self._current_timestamp()),
                     current_working_dir=data.get('current_working_dir', os.getcwd()),
                     total_commands=data.get('total_commands', 0),
                     last_updated=data.get('last_updated', self._current_timestamp()),
-                    commands_history=commands
+                    commands_history=deque(commands, maxlen=self.max_history)
                 )
-            except (json.JSONDecodeError, KeyError) as e:
+
+                if rewrite:
+                    self._session_state = state
+                    self._rewrite_log()
+                    self._save_session()
+
+                return state
+            except (ValueError, KeyError) as e:
+                from shellpilot.ui.console import console
                 console.print(f"[yellow]Warning: Could not load session file: {e}[/yellow]")
                 console.print("[yellow]Creating new session...[/yellow]")
 
         # Create new session
+        return self._new_session_state()
+
+    def _new_session_state(self) -> SessionState:
+        """Fresh, empty session state"""
+        # One clock read serves both the id and the timestamps
+        now = datetime.now()
+        timestamp = now.isoformat()
         return SessionState(
-            session_id=self._generate_session_id(),
-            start_time=self._current_timestamp(),
+            session_id=self._generate_session_id(now),
+            start_time=timestamp,
             current_working_dir=os.getcwd(),
             total_commands=0,
-            last_updated=self._current_timestamp(),
-            commands_history=[]
+            last_updated=timestamp,
+            commands_history=deque(maxlen=self.max_history)
         )
 
-    def _save_session(self) -> None:
-        """Save session to file"""
+    def _load_log(self) -> Tuple[Deque[bytes], bool]:
+        """Read the raw lines of the last max_history commands in the log
+
+        Also reports whether the log ends cleanly, so a torn trailing line
+        can be compacted away before the next append lands on it.
+        """
+        lines = deque(maxlen=self.max_history)
+        if not self.log_file.exists():
+            return lines, True
+
+        line_count = 0
+        with open(self.log_file, 'rb') as f:
+            if os.fstat(f.fileno()).st_size >= _MMAP_MIN_SIZE:
+                with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+                    lines, line_count = self._read_log_tail(mm)
+            else:
+                for line in f:
+                    line_count += 1
+                    lines.append(line)
+        self._log_lines = line_count
+
+        clean = not lines or lines[-1].endswith(b"\n")
+        return lines, clean
+
+    def _read_log_tail(self, mm: mmap.mmap) -> Tuple[Deque[bytes], int]:
+        """Walk a mapped log backwards, copying out only the last lines
+
+        Counting stops just past the compaction threshold, which is all
+        _append_to_log needs to know.
+        """
+        lines = deque(maxlen=self.max_history)
+        count_limit = 2 * self.max_history + 1
+        count = 0
+        end = len(mm)
+
+        while end > 0 and count < count_limit:
+            start = mm.rfind(b"\n", 0, end - 1) + 1
+            if count < self.max_history:
+                lines.appendleft(mm[start:end])
+            count += 1
+            end = start
+
+        return lines, count
+
+    def _history(self) -> Deque[SessionCommand]:
+        """Session history, parsing pending log lines on first access
+
+        Callers that iterate the deque must hold self._lock while they do,
+        since add_command appends to it from other threads.
+        """
+        with self._lock:
+            history = self._session_state.commands_history
+            if self._unparsed_history is not None:
+                for line in self._unparsed_history:
+                    try:
+                        history.append(_intern_command(SessionCommand(**json_loads(line))))
+                    except (ValueError, TypeError):
+                        # Skip a line left half-written by an interrupted append
+                        continue
+                self._unparsed_history = None
+            return history
+
+    def _rewrite_log(self) -> None:
+        """Rewrite the command log with only the commands kept in memory"""
+        try:
+            history = self._history()
+            tmp_file = self.log_file.with_suffix(".jsonl.tmp")
+            tmp_file.write_bytes(b"".join(
+                json_dumps(asdict(cmd)) + b"\n" for cmd in history
+            ))
+            os.replace(tmp_file, self.log_file)
+            self._log_lines = len(history)
+            # Everything in memory is on disk now, pending entries included
+            self._pending_log = []
+        except Exception as e:
+            from shellpilot.ui.console import console
+            console.print(f"[red]Error saving session: {e}[/red]")
+
+    def _append_to_log(self, entries: List[SessionCommand]) -> None:
+        """Append commands to the log, compacting it when it grows"""
         try:
-            # Convert SessionCommand objects to dictionaries
-            session_data = asdict(self._session_state)
+            with open(self.log_file, 'ab') as f:
+                f.write(b"".join(json_dumps(asdict(cmd)) + b"\n" for cmd in entries))
+            self._log_lines += len(entries)
+        except Exception as e:
+            from shellpilot.ui.console import console
+            console.print(f"[red]Error saving session: {e}[/red]")
+            return
+
+        if self._log_lines > 2 * self.max_history:
+            self._rewrite_log()
 
-            with open(self.session_file, 'w') as f:
-                json.dump(session_data, f, indent=2)
+    def _metadata(self) -> Dict[str, Any]:
+        """Session fields stored in session_file"""
+        state = self._session_state
+        return {
+            'session_id': state.session_id,
+            'start_time': state.start_time,
+            'current_working_dir': state.current_working_dir,
+            'total_commands': state.total_commands,
+            'last_updated': state.last_updated,
+        }
+
+    def _save_session(self) -> None:
+        """Save session metadata to file"""
+        try:
+            # Compact on disk; `shellpilot context --dump` pretty-prints
+            self.session_file.write_bytes(json_dumps(self._metadata()))
         except Exception as e:
+            from shellpilot.ui.console import console
             console.print(f"[red]Error saving session: {e}[/red]")
 
+    def _schedule_flush(self) -> None:
+        """Hand pending writes to the background writer"""
+        if self._writer is None:
+            self._writer = threading.Thread(
+                target=self._writer_loop, name="shellpilot-session-writer", daemon=True
+            )
+            self._writer.start()
+        self._wakeup.set()
+
+    def _writer_loop(self) -> None:
+        """Flush whenever woken, then rest so a burst of commands is batched"""
+        while True:
+            self._wakeup.wait()
+            self._wakeup.clear()
+            self.flush()
+            time.sleep(_FLUSH_INTERVAL)
+
+    def flush(self) -> None:
+        """Write pending commands and metadata to disk"""
+        with self._lock:
+            if self._pending_log:
+                pending, self._pending_log = self._pending_log, []
+                self._append_to_log(pending)
+            if self._dirty:
+                self._save_session()
+                self._dirty = False
+
     def _current_timestamp(self) -> str:
         """Get current timestamp as string"""
         return datetime.now().isoformat()
 
-    def _generate_session_id(self) -> str:
+    def _generate_session_id(self, now: Optional[datetime] = None) -> str:
         """Generate unique session ID"""
-        return f"session_{datetime.now().strftime('%Y%m%d_%H%M%S')}"
+        return f"session_{(now or datetime.now()).strftime('%Y%m%d_%H%M%S')}"
 
     def add_command(
         self,
@@ -103,86 +319,202 @@ class SessionStore:
         commands: List[str],
         success: bool,
         ai_summary: Optional[str] = None,
-        execution_time: float = 0.0
+        execution_time: float = 0.0,
+        kind: Optional[str] = None
     ) -> None:
-        """Add a command to the session history"""
-        command_entry = SessionCommand(
-            timestamp=self._current_timestamp(),
+        """Add a command to the session history
+
+        kind is "workflow" or "standard"; when omitted it is derived from
+        the query.
+        """
+        now = self._current_timestamp()
+        cwd = sys.intern(os.getcwd())
+
+        command_entry = _intern_command(SessionCommand(
+            timestamp=now,
             query=query,
             commands=commands,
-            working_dir=os.getcwd(),
+            working_dir=cwd,
             success=success,
             ai_summary=ai_summary,
-            execution_time=execution_time
-        )
+            execution_time=execution_time,
+            kind=kind or ""
+        ))
+
+        with self._lock:
+            # Add to history; the deque's maxlen drops the oldest beyond max_history
+            self._history().append(command_entry)
+
+            # Update session metadata
+            self._session_state.total_commands += 1
+            self._session_state.current_working_dir = cwd
+            self._session_state.last_updated = now
 
-        # Add to history
-        self._session_state.commands_history.append(command_entry)
+            self._pending_log.append(command_entry)
+            self._dirty = True
 
-        # Keep only last N commands
-        if len(self._session_state.commands_history) > self.max_history:
-            self._session_state.commands_history = self._session_state.commands_history[-self.max_history:]
+        # Written in the background so the caller's output isn't held up;
+        # flush() runs at exit for anything still pending
+        self._schedule_flush()
 
-        # Update session metadata
-        self._session_state.total_commands += 1
-        self._session_state.current_working_dir = os.getcwd()
-        self._session_state.last_updated = self._current_timestamp()
+    def get_recent_commands(
+        self,
+        count: int = 10,
+        offset: int = 0,
+        success: Optional[bool] = None,
+        before: Optional[str] = None
+    ) -> List[SessionCommand]:
+        """Get recent commands from history, oldest first
+
+        offset skips that many of the newest commands, for paging back;
+        success, if given, keeps only commands that did or didn't succeed;
+        before, an ISO timestamp, keeps only commands older than it.
+        """
+        # islice rejects negative bounds; treat them as an empty page / no skip
+        count = max(0, count)
+        offset = max(0, offset)
+        # The page is copied out under the lock; iterating the deque while
+        # another thread appends to it raises RuntimeError
+        with self._lock:
+            history = self._history()
+            if success is None and before is None:
+                end = max(0, len(history) - offset)
+                return list(islice(history, max(0, end - count), end))
 
-        # Save to file
-        self._save_session()
+            # Newest first; ISO timestamps compare correctly as strings
+            matching = reversed(history)
+            if before is not None:
+                matching = (cmd for cmd in matching if cmd.timestamp < before)
+            if success is not None:
+                matching = (cmd for cmd in matching if cmd.success == success)
+            page = list(islice(matching, offset, offset + count))
+        page.reverse()
+        return page
 
-    def get_recent_commands(self, count: int = 10) -> List[SessionCommand]:
-        """Get recent commands from history"""
-        return self._session_state.commands_history[-count:]
+    def get_stats(self, window: int = 50) -> Dict[str, Any]:
+        """Counts and timing over the last window commands, in one pass"""
+        recent_commands = self.get_recent_commands(window)
 
-    def get_context_summary(self) -> str:
+        successful = 0
+        workflows = 0
+        total_time = 0.0
+        for cmd in recent_commands:
+            total_time += cmd.execution_time
+            if cmd.success:
+                successful += 1
+            if cmd.kind == "workflow":
+                workflows += 1
+
+        count = len(recent_commands)
+        return {
+            "count": count,
+            "successful": successful,
+            "failed": count - successful,
+            "workflow": workflows,
+            "standard": count - workflows,
+            "total_execution_time": total_time,
+        }
+
+    def get_context_summary(self, max_tokens: int = _CONTEXT_MAX_TOKENS) -> str:
         """Generate context summary for AI prompts"""
-        recent_commands = self.get_recent_commands(5)
+        return self._format_context(self.get_recent_commands(5), max_tokens)
+
+    def _format_context(
+        self, recent_commands: List[SessionCommand], max_tokens: int = _CONTEXT_MAX_TOKENS
+    ) -> str:
+        """Render the given commands as the context summary
 
+        Keeps the newest commands that fit in max_tokens (estimated), so
+        long queries can't grow the prompt without bound.
+        """
         if not recent_commands:
             return "No previous commands in this session."
 
+        # Rendered fields of the newest commands that fit in the budget
+        budget = max_tokens * _CHARS_PER_TOKEN
+        entries: List[Tuple[str, str, str, str, Optional[str]]] = []
+        for cmd in reversed(recent_commands):
+            commands = cmd.commands
+            entry = (
+                "✅" if cmd.success else "❌",
+                _clip(cmd.query),
+                _clip(commands[0] if len(commands) == 1 else ", ".join(commands[:2])),
+                "..." if len(commands) > 2 else "",
+                _clip(cmd.ai_summary) if cmd.ai_summary else None,
+            )
+            budget -= sum(len(field) for field in entry if field)
+            if budget < 0 and entries:
+                break
+            entries.append(entry)
+        entries.reverse()
+
         context_lines = [
-            f"Session Context (Last {len(recent_commands)} commands):",
+            f"Session Context (Last {len(entries)} commands):",
             f"Current Directory: {self._session_state.current_working_dir}",
             f"Session Started: {self._session_state.start_time}",
             ""
         ]
 
-        for i, cmd in enumerate(recent_commands, 1):
-            status = "✅" if cmd.success else "❌"
-            context_lines.append(f"{i}. {status} '{cmd.query}' -> {', '.join(cmd.commands[:2])}{'...' if len(cmd.commands) > 2 else ''}")
-            if cmd.ai_summary:
-                context_lines.append(f"   Summary: {cmd.ai_summary}")
+        for i, (status, query, commands, more, ai_summary) in enumerate(entries, 1):
+            context_lines.append(_CONTEXT_LINE(i, status, query, commands, more))
+            if ai_summary:
+                context_lines.append("   Summary: " + ai_summary)
 
         return "\n".join(context_lines)
 
+    def snapshot(self) -> SessionSnapshot:
+        """Session id, count, recent commands and context summary in one go"""
+        recent_commands = self.get_recent_commands(5)
+        return SessionSnapshot(
+            session_id=self._session_state.session_id,
+            total_commands=self._session_state.total_commands,
+            recent_commands=recent_commands,
+            context_summary=self._format_context(recent_commands)
+        )
+
+    def get_session_id(self) -> str:
+        """Get the current session id without building the full info dict"""
+        return self._session_state.session_id
+
     def get_session_info(self) -> Dict[str, Any]:
         """Get session information"""
-        return {
-            "session_id": self._session_state.session_id,
-            "start_time": self._session_state.start_time,
-            "current_working_dir": self._session_state.current_working_dir,
-            "total_commands": self._session_state.total_commands,
-            "last_updated": self._session_state.last_updated,
-            "commands_in_history": len(self._session_state.commands_history)
-        }
+        # Locked so the fields come from one state and the unparsed lines
+        # can't be consumed between the check and the len()
+        with self._lock:
+            return {
+                "session_id": self._session_state.session_id,
+                "start_time": self._session_state.start_time,
+                "current_working_dir": self._session_state.current_working_dir,
+                "total_commands": self._session_state.total_commands,
+                "last_updated": self._session_state.last_updated,
+                "commands_in_history": (
+                    len(self._unparsed_history) if self._unparsed_history is not None
+                    else len(self._session_state.commands_history)
+                )
+            }
 
     def clear_session(self) -> None:
         """Clear session history"""
-        self._session_state = SessionState(
-            session_id=self._generate_session_id(),
-            start_time=self._current_timestamp(),
-            current_working_dir=os.getcwd(),
-            total_commands=0,
-            last_updated=self._current_timestamp(),
-            commands_history=[]
-        )
-        self._save_session()
+        # Synchronous, and under the lock so a pending write can't land after it
+        with self._lock:
+            self._session_state = self._new_session_state()
+            self._unparsed_history = None
+            self._rewrite_log()
+            self._save_session()
+            self._dirty = False
+        from shellpilot.ui.console import console
         console.print("[green]✅ Session context cleared[/green]")
 
+    def export_session(self) -> Dict[str, Any]:
+        """Session metadata and full history as one JSON-ready dict"""
+        with self._lock:
+            data = self._metadata()
+            data['commands_history'] = [asdict(cmd) for cmd in self._history()]
+        return data
+
     def get_session_state(self) -> SessionState:
         """Get current session state"""
+        self._history()
         return self._session_state
 
 # Global session store instance
@@ -3,16 +3,43 @@ Multi-step workflow execution for ShellPilot
 Handles complex tasks with dependencies, conditional logic, and error recovery
 """
 
-import json
+import re
+import zlib
+from collections import Counter
 from typing import List, Dict, Any, Optional, Union
-from dataclasses import dataclass, asdict
+from dataclasses import dataclass
 from enum import Enum
-from rich.console import Console
-from rich.panel import Panel
-from rich.progress import Progress, TaskID
-from rich.table import Table
 
-console = Console()
+from shellpilot.utils.compat import DATACLASS_SLOTS
+
+# Command categories in priority order: (step label, keywords)
+_COMMAND_GROUPS = [
+    ("System Update", ['apt update', 'yum update', 'dnf update']),
+    ("Package Installation", ['apt install', 'yum install', 'dnf install']),
+    ("Service Management", ['systemctl', 'service']),
+    ("Firewall Configuration", ['ufw', 'iptables', 'firewall']),
+    ("Web Server Setup", ['nginx', 'apache', 'httpd']),
+    ("Container Setup", ['docker', 'container']),
+    ("Repository Setup", ['git clone', 'git']),
+    ("File System Setup", ['chmod', 'chown', 'mkdir']),
+]
+
+# Step headers in AI responses (### Step X, ## Phase X, etc.)
+_STEP_HEADER_RE = re.compile("step |phase |stage ", re.IGNORECASE)
+
+# Commands that need extra confirmation
+_CRITICAL_RE = re.compile(
+    "|".join(map(re.escape, [
+        'rm ', 'del ', 'format', 'mkfs',
+        'systemctl stop', 'service stop',
+        'ufw disable', 'iptables -F',
+        'chmod 777', 'chown root'
+    ])),
+    re.IGNORECASE
+)
+
+# Steps whose failure should stop the workflow
+_STOP_ON_FAILURE_RE = re.compile("install|update|setup|configure", re.IGNORECASE)
 
 class StepStatus(str, Enum):
     """Status of a workflow step"""
@@ -30,7 +57,7 @@ class StepType(str, Enum):
     PARALLEL = "parallel"
     ROLLBACK = "rollback"
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class WorkflowStep:
     """Represents a single step in a workflow"""
     id: str
@@ -54,7 +81,7 @@ class WorkflowStep:
         if self.rollback_commands is None:
             self.rollback_commands = []
 
-@dataclass
+@dataclass(**DATACLASS_SLOTS)
 class Workflow:
     """Represents a complete multi-step workflow"""
     id: str
@@ -72,7 +99,11 @@ class WorkflowEngine:
     def __init__(self, executor, safety_checker):
         self.executor = executor
         self.safety_checker = safety_checker
-        self.console = console
+
+    @property
+    def console(self):
+        from shellpilot.ui.console import console
+        return console
 
     def create_workflow_from_llm_response(self, query: str, llm_response, ai_plan: str = "") -> Workflow:
         """Create a workflow from LLM response with intelligent step grouping"""
@@ -84,8 +115,10 @@ class WorkflowEngine:
         if not workflow_steps:
             workflow_steps = self._create_simple_workflow(llm_response.commands)
 
+        # crc32 rather than hash(): str hashes are salted per process, so
+        # the same query would get a different id on every run
         workflow = Workflow(
-            id=f"workflow_{'_'.join(query.split()[:3])}_{hash(query)%10000}",
+            id=f"workflow_{'_'.join(query.split()[:3])}_{zlib.crc32(query.encode()) % 10000}",
             name=f"Workflow: {query[:50]}{'...' if len(query) > 50 else ''}",
             description=f"Multi-step execution for: {query}",
             steps=workflow_steps,
@@ -99,6 +132,14 @@ class WorkflowEngine:
         """Parse AI response for workflow structure (steps, dependencies, etc.)"""
         steps = []
 
+        # Without commands no step can collect any, so there is no structure
+        if not commands:
+            return steps
+
+        # Cheap pre-check: one scan tells whether a line contains any command
+        # at all before running the per-command substring loop
+        any_command_re = re.compile("|".join(map(re.escape, commands)))
+
         # Look for structured steps in AI response
         lines = ai_content.split('\n')
         current_step = None
@@ -109,7 +150,7 @@ class WorkflowEngine:
             line = line.strip()
 
             # Detect step headers (### Step X, ## Phase X, etc.)
-            if any(pattern in line.lower() for pattern in ['step ', 'phase ', 'stage ']):
+            if _STEP_HEADER_RE.search(line):
                 # Save previous step
                 if current_step and step_commands:
                     steps.append(WorkflowStep(
@@ -125,7 +166,7 @@ class WorkflowEngine:
                 step_commands = []
 
             # Collect commands for current step
-            elif current_step:
+            elif current_step and any_command_re.search(line):
                 for cmd in commands:
                     if cmd in line:
                         step_commands.append(cmd)
@@ -170,25 +211,12 @@ class WorkflowEngine:
         current_group = "Setup"
 
         for cmd in commands:
-            # Categorize commands
-            if any(x in cmd for x in ['apt update', 'yum update', 'dnf update']):
-                current_group = "System Update"
-            elif any(x in cmd for x in ['apt install', 'yum install', 'dnf install']):
-                current_group = "Package Installation"
-            elif any(x in cmd for x in ['systemctl', 'service']):
-                current_group = "Service Management"
-            elif any(x in cmd for x in ['ufw', 'iptables', 'firewall']):
-                current_group = "Firewall Configuration"
-            elif any(x in cmd for x in ['nginx', 'apache', 'httpd']):
-                current_group = "Web Server Setup"
-            elif any(x in cmd for x in ['docker', 'container']):
-                current_group = "Container Setup"
-            elif any(x in cmd for x in ['git clone', 'git']):
-                current_group = "Repository Setup"
-            elif any(x in cmd for x in ['chmod', 'chown', 'mkdir']):
-                current_group = "File System Setup"
-            else:
-                current_group = "Configuration"
+            # Categorize commands: the first group with a keyword in the command wins
+            current_group = "Configuration"
+            for label, keywords in _COMMAND_GROUPS:
+                if any(x in cmd for x in keywords):
+                    current_group = label
+                    break
 
             if current_group not in groups:
                 groups[current_group] = []
@@ -198,6 +226,10 @@ class WorkflowEngine:
 
     def execute_workflow(self, workflow: Workflow, interactive: bool = True) -> bool:
         """Execute a complete workflow with dependency handling"""
+        from rich.panel import Panel
+        from rich.progress import Progress
+        from shellpilot.ui.console import console
+
         console.print(Panel(
             f"[bold blue]Starting Workflow Execution[/bold blue]\n"
             f"[cyan]Name:[/cyan] {workflow.name}\n"
@@ -219,11 +251,12 @@ class WorkflowEngine:
 
         # Execute steps in dependency order
         success = True
+        step_by_id = {s.id: s for s in workflow.steps}
         with Progress() as progress:
             task = progress.add_task("[cyan]Executing workflow...", total=len(workflow.steps))
 
             for step in workflow.steps:
-                if not self._can_execute_step(step, workflow):
+                if not self._can_execute_step(step, step_by_id):
                     step.status = StepStatus.SKIPPED
                     console.print(f"[yellow]⏭️  Skipping {step.name} (dependencies not met)[/yellow]")
                     progress.advance(task)
@@ -247,6 +280,9 @@ class WorkflowEngine:
 
     def _display_workflow_plan(self, workflow: Workflow) -> None:
         """Display the workflow execution plan"""
+        from rich.table import Table
+        from shellpilot.ui.console import console
+
         table = Table(title="📋 Workflow Execution Plan")
         table.add_column("Step", style="cyan", no_wrap=True)
         table.add_column("Name", style="green")
@@ -269,13 +305,13 @@ class WorkflowEngine:
 
         console.print(table)
 
-    def _can_execute_step(self, step: WorkflowStep, workflow: Workflow) -> bool:
+    def _can_execute_step(self, step: WorkflowStep, step_by_id: Dict[str, WorkflowStep]) -> bool:
         """Check if step dependencies are satisfied"""
         if not step.depends_on:
             return True
 
         for dep_id in step.depends_on:
-            dep_step = next((s for s in workflow.steps if s.id == dep_id), None)
+            dep_step = step_by_id.get(dep_id)
             if not dep_step or dep_step.status != StepStatus.SUCCESS:
                 return False
 
@@ -283,8 +319,22 @@ class WorkflowEngine:
 
     def _execute_step(self, step: WorkflowStep, workflow: Workflow, interactive: bool = True) -> bool:
         """Execute a single workflow step"""
-        console.print(f"\n[bold cyan]🔄 Executing Step: {step.name}[/bold cyan]")
-        console.print(f"[dim]{step.description}[/dim]")
+        from rich.console import Group
+        from rich.text import Text
+        from shellpilot.ui.console import console
+
+        # Status lines are prebuilt Text (no markup parsing, and commands
+        # containing brackets print verbatim) and printed as one Group,
+        # flushed early only when a prompt has to appear in order
+        lines = [
+            Text.assemble("\n", (f"🔄 Executing Step: {step.name}", "bold cyan")),
+            Text(step.description, style="dim"),
+        ]
+
+        def flush_lines() -> None:
+            if lines:
+                console.print(Group(*lines))
+                lines.clear()
 
         step.status = StepStatus.RUNNING
 
@@ -295,15 +345,17 @@ class WorkflowEngine:
         for cmd in step.commands:
             # Safety check
             if not self.safety_checker.is_safe_to_execute(cmd):
-                console.print(f"[red]❌ Command blocked for safety: {cmd}[/red]")
+                lines.append(Text(f"❌ Command blocked for safety: {cmd}", style="red"))
+                flush_lines()
                 step.status = StepStatus.FAILED
                 step.error_message = f"Command blocked for safety: {cmd}"
                 return False
 
             # Interactive confirmation for critical commands
             if interactive and self._is_critical_command(cmd):
+                flush_lines()
                 if not console.input(f"[yellow]Execute: {cmd}? [Y/n]: [/yellow]").lower() in ['', 'y', 'yes']:
-                    console.print(f"[yellow]⏭️  Skipped: {cmd}[/yellow]")
+                    lines.append(Text(f"⏭️  Skipped: {cmd}", style="yellow"))
                     continue
 
             # Execute command
@@ -311,50 +363,52 @@ class WorkflowEngine:
             step_output.append(f"Command: {cmd}\nOutput: {result.stdout}\nError: {result.stderr}")
 
             if not result.success:
-                console.print(f"[red]❌ Command failed: {cmd}[/red]")
+                lines.append(Text(f"❌ Command failed: {cmd}", style="red"))
                 step.status = StepStatus.FAILED
                 step.error_message = result.stderr
                 all_success = False
 
                 # Try retry logic
                 if step.retry_count < step.max_retries:
-                    console.print(f"[yellow]🔄 Retrying step {step.name} ({step.retry_count + 1}/{step.max_retries})[/yellow]")
+                    lines.append(Text(
+                        f"🔄 Retrying step {step.name} ({step.retry_count + 1}/{step.max_retries})",
+                        style="yellow"
+                    ))
+                    flush_lines()
                     step.retry_count += 1
                     step.status = StepStatus.RETRYING
                     return self._execute_step(step, workflow, interactive)
 
                 break
             else:
-                console.print(f"[green]✅ {cmd}[/green]")
+                lines.append(Text(f"✅ {cmd}", style="green"))
 
         if all_success:
             step.status = StepStatus.SUCCESS
             step.output = "\n".join(step_output)
-            console.print(f"[green]✅ Step completed: {step.name}[/green]")
+            lines.append(Text(f"✅ Step completed: {step.name}", style="green"))
 
+        flush_lines()
         return all_success
 
     def _is_critical_command(self, cmd: str) -> bool:
         """Check if command needs extra confirmation"""
-        critical_patterns = [
-            'rm ', 'del ', 'format', 'mkfs',
-            'systemctl stop', 'service stop',
-            'ufw disable', 'iptables -F',
-            'chmod 777', 'chown root'
-        ]
-        return any(pattern in cmd.lower() for pattern in critical_patterns)
+        return _CRITICAL_RE.search(cmd) is not None
 
     def _should_stop_on_failure(self, step: WorkflowStep, workflow: Workflow) -> bool:
         """Determine if workflow should stop on this step's failure"""
         # Critical steps that should stop the workflow
-        critical_keywords = ['install', 'update', 'setup', 'configure']
-        return any(keyword in step.name.lower() for keyword in critical_keywords)
+        return _STOP_ON_FAILURE_RE.search(step.name) is not None
 
     def _display_workflow_summary(self, workflow: Workflow) -> None:
         """Display workflow execution summary"""
-        successful_steps = sum(1 for step in workflow.steps if step.status == StepStatus.SUCCESS)
-        failed_steps = sum(1 for step in workflow.steps if step.status == StepStatus.FAILED)
-        skipped_steps = sum(1 for step in workflow.steps if step.status == StepStatus.SKIPPED)
+        from rich.panel import Panel
+        from shellpilot.ui.console import console
+
+        counts = Counter(step.status for step in workflow.steps)
+        successful_steps = counts[StepStatus.SUCCESS]
+        failed_steps = counts[StepStatus.FAILED]
+        skipped_steps = counts[StepStatus.SKIPPED]
 
         summary_panel = Panel(
             f"[bold]Workflow Summary[/bold]\n"
@@ -3,24 +3,16 @@
 ShellPilot - AI-Powered Linux System Administration CLI
 """
 
+import sys
 import typer
 import time
-from typing import Optional
+from typing import List, Optional
 from enum import Enum
-import sys
-from pathlib import Path
-from rich.console import Console
-from rich.panel import Panel
-from rich import print
-from dataclasses import dataclass, asdict
 
 from shellpilot import __version__
-from shellpilot.config import Config, get_config
-from shellpilot.core.session import get_session_store
-from shellpilot.core.workflow import WorkflowEngine
 
-# Initialize rich console
-console = Console()
+# Rich, config and core modules are imported inside the commands that use
+# them, so --help and --version don't load them
 
 # Create the main CLI app
 app = typer.Typer(
@@ -46,11 +38,50 @@ class LogLevel(str, Enum):
     warning = "warning"
     error = "error"
 
+def _generate_with_preview(llm_manager, title: str, *args, **kwargs):
+    """Run generate_command, showing the response in a live panel as it streams
+
+    The preview is transient; callers render the final response as before.
+    """
+    from rich.live import Live
+    from rich.panel import Panel
+    from shellpilot.ui.console import console
+
+    with Live(console=console, transient=True, refresh_per_second=8) as live:
+        def on_text(text: str) -> None:
+            live.update(Panel(text, title=title, border_style="dim"))
+
+        return llm_manager.generate_command(*args, on_text=on_text, **kwargs)
+
+def _render_header(title: str, heading: str, fields, border: str,
+                   version: Optional[str] = None, footer: Optional[str] = None):
+    """Build a command's header panel
+
+    The panel is assembled from styled Text segments rather than markup, so
+    nothing is re-parsed per render and values containing brackets print as-is.
+    """
+    from rich.panel import Panel
+    from rich.text import Text
+
+    text = Text()
+    text.append(heading, style=f"bold {border}")
+    if version:
+        text.append(f" v{version}")
+    for name, value in fields:
+        text.append("\n")
+        text.append(f"{name}:", style="cyan")
+        text.append(f" {value}")
+    if footer:
+        text.append("\n")
+        text.append(footer, style="dim")
+    return Panel(text, title=title, border_style=border)
+
 def version_callback(value: bool):
     """Show version and exit"""
     if value:
-        print(f"[bold green]ShellPilot[/bold green] v{__version__}")
-        print("[dim]AI-Powered Linux System Administration[/dim]")
+        # Plain print: --version shouldn't need Rich at all
+        print(f"ShellPilot v{__version__}")
+        print("AI-Powered Linux System Administration")
         raise typer.Exit()
 
 @app.callback()
@@ -106,6 +137,11 @@ def run(
         False,
         "--workflow", "-w",
         help="Execute as intelligent multi-step workflow"
+    ),
+    no_cache: bool = typer.Option(
+        False,
+        "--no-cache",
+        help="Ask the AI again even if this prompt was answered before"
     )
 ):
     """
@@ -120,7 +156,13 @@ def run(
         shellpilot run "continue from where we left off" --clear-context
         shellpilot run "set up web server" --workflow
     """
-    start_time = time.time()
+    from rich.markup import escape
+    from rich.panel import Panel
+    from shellpilot.ui.console import console
+    from shellpilot.config import get_config
+    from shellpilot.core.session import get_session_store
+
+    start = time.perf_counter()
 
     try:
         # Initialize session store
@@ -134,46 +176,57 @@ def run(
         config = get_config()
 
         # Override config with CLI options if provided
-        if provider:
-            config.set_default_provider(provider.value)
-        if model:
-            config.set_default_model(model)
+        with config.batch():
+            if provider:
+                config.set_default_provider(provider.value)
+            if model:
+                config.set_default_model(model)
 
         # Get actual values from config
         actual_provider = config.get_default_provider()
         actual_model = config.get_default_model() or "default"
 
         # Show header with session info
-        session_info = session_store.get_session_info()
-        console.print(Panel(
-            f"[bold green]ShellPilot[/bold green] v{__version__}\n"
-            f"[cyan]Provider:[/cyan] {actual_provider}\n"
-            f"[cyan]Model:[/cyan] {actual_model}\n"
-            f"[cyan]Safe Mode:[/cyan] {'✅ Enabled' if safe_mode else '❌ Disabled'}\n"
-            f"[cyan]Dry Run:[/cyan] {'✅ Yes' if dry_run else '❌ No'}\n"
-            f"[cyan]Workflow:[/cyan] {'🔄 Enabled' if workflow_mode else '📋 Standard'}\n"
-            f"[dim]Session: {session_info['session_id']} | Commands: {session_info['total_commands']}[/dim]",
-            title="🚁 AI System Administration",
-            border_style="green"
-        ))
+        snapshot = session_store.snapshot()
+        header_fields = (
+            ("Provider", actual_provider),
+            ("Model", actual_model),
+            ("Safe Mode", '✅ Enabled' if safe_mode else '❌ Disabled'),
+            ("Dry Run", '✅ Yes' if dry_run else '❌ No'),
+            ("Workflow", '🔄 Enabled' if workflow_mode else '📋 Standard'),
+        )
+        session_line = f"Session: {snapshot.session_id} | Commands: {snapshot.total_commands}"
+        if console.is_terminal:
+            console.print(_render_header(
+                "🚁 AI System Administration", "ShellPilot", header_fields, "green",
+                version=__version__, footer=session_line
+            ))
+        else:
+            # Piped or redirected: plain lines, skipping Rich's panel layout
+            sys.stdout.write(
+                f"ShellPilot v{__version__}\n"
+                + "".join(f"{name}: {value}\n" for name, value in header_fields)
+                + f"{session_line}\n"
+            )
 
         # Import core modules
         from shellpilot.core.llm import LLMManager
-        from shellpilot.core.executor import CommandExecutor
 
         # Initialize components
         llm_manager = LLMManager(config)
-        executor = CommandExecutor(safe_mode=safe_mode, dry_run=dry_run)
 
         # Get session context for AI
-        context = session_store.get_context_summary()
+        context = snapshot.context_summary
 
         # Generate commands using AI with context
         console.print(f"[cyan]🤖 Analyzing:[/cyan] {query}")
-        if context and "No previous commands" not in context:
-            console.print(f"[dim]📋 Using session context ({len(session_store.get_recent_commands())} recent commands)[/dim]")
+        if snapshot.recent_commands:
+            console.print(f"[dim]📋 Using session context ({len(snapshot.recent_commands)} recent commands)[/dim]")
 
-        llm_response = llm_manager.generate_command(query, context if context else None)
+        llm_response = _generate_with_preview(
+            llm_manager, "🤖 AI Analysis",
+            query, context if context else None, use_cache=not no_cache
+        )
 
         if not llm_response.commands:
             console.print("[yellow]No commands generated.[/yellow]")
@@ -190,7 +243,7 @@ def run(
                 commands=[],
                 success=False,
                 ai_summary="No commands generated",
-                execution_time=time.time() - start_time
+                execution_time=time.perf_counter() - start
             )
             return
 
@@ -201,13 +254,22 @@ def run(
             border_style="blue"
         ))
 
+        # Only needed once there are commands to run (or preview)
+        from shellpilot.core.executor import CommandExecutor
+        executor = CommandExecutor(safe_mode=safe_mode, dry_run=dry_run)
+
         # Choose execution mode: Workflow vs Standard
-        if workflow_mode or len(llm_response.commands) > 6:
+        is_workflow = workflow_mode or len(llm_response.commands) > 6
+        mode_text = "workflow steps" if is_workflow else "commands"
+        mode_icon = "🔄" if is_workflow else "📋"
+
+        if is_workflow:
             # WORKFLOW MODE for complex tasks
             console.print(f"\n[blue]🔄 Workflow Mode:[/blue] {len(llm_response.commands)} commands → Intelligent workflow")
 
             # Initialize workflow components
             from shellpilot.core.safety import SafetyChecker
+            from shellpilot.core.workflow import WorkflowEngine
             safety_checker = SafetyChecker(safe_mode)
             workflow_engine = WorkflowEngine(executor, safety_checker)
 
@@ -230,11 +292,14 @@ def run(
 
         else:
             # STANDARD MODE for simple tasks
-            console.print(f"\n[green]📋 Standard Mode:[/green] {len(llm_response.commands)} commands")
-            for i, cmd in enumerate(llm_response.commands, 1):
-                console.print(f"  {i}. [cyan]{cmd}[/cyan]")
+            # One render for the whole listing; commands are escaped so
+            # brackets in them aren't read as markup
+            console.print("\n".join([
+                f"\n[green]📋 Standard Mode:[/green] {len(llm_response.commands)} commands",
+                *(f"  {i}. [cyan]{escape(cmd)}[/cyan]" for i, cmd in enumerate(llm_response.commands, 1))
+            ]))
 
-            results = executor.execute_multiple(llm_response.commands)
+            results = executor.execute_multiple(llm_response.commands, parallel=True)
 
             # Calculate success
             successful_steps = sum(1 for r in results if r.success)
@@ -242,36 +307,174 @@ def run(
             overall_success = successful_steps == total_steps
 
         # Create AI summary
-        mode_text = "workflow steps" if (workflow_mode or len(llm_response.commands) > 6) else "commands"
         ai_summary = f"Executed {successful_steps}/{total_steps} {mode_text} successfully"
 
         if llm_response.content:
             # Extract brief summary from AI response
-            first_sentence = llm_response.content.split('.')[0]
+            first_sentence = llm_response.content.partition('.')[0]
             if len(first_sentence) < 100:
                 ai_summary = first_sentence.strip()
 
         # Record in session
+        elapsed = time.perf_counter() - start
         session_store.add_command(
             query=query,
             commands=llm_response.commands,
             success=overall_success,
             ai_summary=ai_summary,
-            execution_time=time.time() - start_time
+            execution_time=elapsed
         )
 
         # Final summary
-        mode_icon = "🔄" if (workflow_mode or len(llm_response.commands) > 6) else "📋"
-        console.print(f"\n[green]✅ {successful_steps}/{total_steps} {mode_text} executed successfully[/green]")
-        console.print(f"[dim]{mode_icon} Session updated | Total commands: {session_store.get_session_info()['total_commands']}[/dim]")
+        console.print(
+            f"\n[green]✅ {successful_steps}/{total_steps} {mode_text} executed successfully[/green]\n"
+            f"[dim]{mode_icon} Session updated | Total commands: {snapshot.total_commands + 1}[/dim]"
+        )
+
+    except KeyboardInterrupt:
+        console.print("\n[yellow]⚠️  Operation cancelled by user[/yellow]")
+        raise typer.Exit(1)
+    except Exception as e:
+        console.print(f"\n[red]❌ Error: {str(e)}[/red]")
+        if log_level == LogLevel.debug:
+            console.print_exception()
+        else:
+            console.print("[dim]Run with --log-level debug for the full traceback[/dim]")
+        raise typer.Exit(1)
+
+@app.command("run-many")
+def run_many(
+    queries: List[str] = typer.Argument(
+        ...,
+        help="Independent queries to answer and execute"
+    ),
+    provider: Optional[LLMProvider] = typer.Option(
+        None,
+        "--provider", "-p",
+        help="LLM provider to use"
+    ),
+    model: Optional[str] = typer.Option(
+        None,
+        "--model", "-m",
+        help="Specific model to use"
+    ),
+    safe_mode: bool = typer.Option(
+        True,
+        "--safe-mode/--unsafe",
+        help="Enable safety confirmations for destructive operations"
+    ),
+    log_level: LogLevel = typer.Option(
+        LogLevel.info,
+        "--log-level", "-l",
+        help="Set logging level"
+    ),
+    dry_run: bool = typer.Option(
+        False,
+        "--dry-run", "-n",
+        help="Show what would be executed without running commands"
+    )
+):
+    """
+    Execute several unrelated queries, asking the AI about all of them at once
+
+    The AI requests overlap; the commands still run one query at a time,
+    in the order given.
+
+    Examples:
+    \b
+        shellpilot run-many "check disk usage" "show memory usage"
+        shellpilot run-many "list open ports" "show failed services" --dry-run
+    """
+    from rich.markup import escape
+    from rich.panel import Panel
+    from shellpilot.ui.console import console
+    from shellpilot.config import get_config
+    from shellpilot.core.session import get_session_store
+
+    try:
+        session_store = get_session_store()
+        config = get_config()
+
+        with config.batch():
+            if provider:
+                config.set_default_provider(provider.value)
+            if model:
+                config.set_default_model(model)
+
+        snapshot = session_store.snapshot()
+        console.print(_render_header(
+            "🚁 AI System Administration", "ShellPilot", (
+                ("Provider", config.get_default_provider()),
+                ("Model", config.get_default_model() or "default"),
+                ("Queries", len(queries)),
+                ("Safe Mode", '✅ Enabled' if safe_mode else '❌ Disabled'),
+                ("Dry Run", '✅ Yes' if dry_run else '❌ No'),
+            ), "green", version=__version__
+        ))
+
+        from shellpilot.core.llm import LLMManager
+        llm_manager = LLMManager(config)
+
+        context = snapshot.context_summary
+        with console.status(f"[cyan]🤖 Analyzing {len(queries)} queries...[/cyan]"):
+            start = time.perf_counter()
+            responses = llm_manager.generate_commands_batch(queries, context if context else None)
+            # Shared out evenly, since the requests ran side by side
+            analysis_time = (time.perf_counter() - start) / len(queries)
+
+        from shellpilot.core.executor import CommandExecutor
+        executor = CommandExecutor(safe_mode=safe_mode, dry_run=dry_run)
+
+        succeeded = 0
+        for query, llm_response in zip(queries, responses):
+            start = time.perf_counter()
+            console.print(f"\n[cyan]🤖 Query:[/cyan] {escape(query)}")
+
+            if not llm_response.commands:
+                console.print("[yellow]No commands generated.[/yellow]")
+                if llm_response.content:
+                    console.print(Panel(llm_response.content, title="🤖 AI Response", border_style="yellow"))
+                session_store.add_command(
+                    query=query,
+                    commands=[],
+                    success=False,
+                    ai_summary="No commands generated",
+                    execution_time=analysis_time + time.perf_counter() - start
+                )
+                continue
+
+            console.print(Panel(llm_response.content, title="🤖 AI Analysis", border_style="blue"))
+            console.print("\n".join(
+                f"  {i}. [cyan]{escape(cmd)}[/cyan]" for i, cmd in enumerate(llm_response.commands, 1)
+            ))
+
+            results = executor.execute_multiple(llm_response.commands, parallel=True)
+            successful = sum(1 for r in results if r.success)
+            overall_success = successful == len(results)
+            succeeded += overall_success
+
+            session_store.add_command(
+                query=query,
+                commands=llm_response.commands,
+                success=overall_success,
+                ai_summary=f"Executed {successful}/{len(results)} commands successfully",
+                execution_time=analysis_time + time.perf_counter() - start
+            )
+
+        console.print(
+            f"\n[green]✅ {succeeded}/{len(queries)} queries completed successfully[/green]\n"
+            f"[dim]📋 Session updated | Total commands: {snapshot.total_commands + len(queries)}[/dim]"
+        )
 
     except KeyboardInterrupt:
         console.print("\n[yellow]⚠️  Operation cancelled by user[/yellow]")
         raise typer.Exit(1)
     except Exception as e:
         console.print(f"\n[red]❌ Error: {str(e)}[/red]")
-        import traceback
-        console.print(f"[dim]{traceback.format_exc()}[/dim]")
+        if log_level == LogLevel.debug:
+            console.print_exception()
+        else:
+            console.print("[dim]Run with --log-level debug for the full traceback[/dim]")
         raise typer.Exit(1)
 
 @app.command()
@@ -304,6 +507,16 @@ def workflow(
         False,
         "--auto-approve", "-y",
         help="Auto-approve non-critical steps"
+    ),
+    log_level: LogLevel = typer.Option(
+        LogLevel.info,
+        "--log-level", "-l",
+        help="Set logging level"
+    ),
+    no_cache: bool = typer.Option(
+        False,
+        "--no-cache",
+        help="Ask the AI again even if this prompt was answered before"
     )
 ):
     """
@@ -316,7 +529,12 @@ def workflow(
         shellpilot workflow "install Docker and containers" --auto-approve
         shellpilot workflow "backup and optimize system"
     """
-    start_time = time.time()
+    from rich.panel import Panel
+    from shellpilot.ui.console import console
+    from shellpilot.config import get_config
+    from shellpilot.core.session import get_session_store
+
+    start = time.perf_counter()
 
     try:
         # Initialize components
@@ -324,20 +542,24 @@ def workflow(
         config = get_config()
 
         # Override config with CLI options
-        if provider:
-            config.set_default_provider(provider.value)
-        if model:
-            config.set_default_model(model)
+        with config.batch():
+            if provider:
+                config.set_default_provider(provider.value)
+            if model:
+                config.set_default_model(model)
+
+        # Get actual values from config
+        actual_provider = config.get_default_provider()
+        actual_model = config.get_default_model() or "default"
 
         # Show workflow header
-        console.print(Panel(
-            f"[bold blue]🔄 ShellPilot Workflow Engine[/bold blue] v{__version__}\n"
-            f"[cyan]Provider:[/cyan] {config.get_default_provider()}\n"
-            f"[cyan]Model:[/cyan] {config.get_default_model() or 'default'}\n"
-            f"[cyan]Mode:[/cyan] {'🔍 Planning' if dry_run else '⚡ Execution'}\n"
-            f"[cyan]Safety:[/cyan] {'✅ Interactive' if safe_mode and not auto_approve else '🚀 Auto-approve'}",
-            title="🧠 Intelligent Multi-Step Workflows",
-            border_style="blue"
+        console.print(_render_header(
+            "🧠 Intelligent Multi-Step Workflows", "🔄 ShellPilot Workflow Engine", (
+                ("Provider", actual_provider),
+                ("Model", actual_model),
+                ("Mode", '🔍 Planning' if dry_run else '⚡ Execution'),
+                ("Safety", '✅ Interactive' if safe_mode and not auto_approve else '🚀 Auto-approve'),
+            ), "blue", version=__version__
         ))
 
         # Import core modules
@@ -345,6 +567,7 @@ def workflow(
         from shellpilot.core.executor import CommandExecutor
         from shellpilot.core.safety import SafetyChecker
         from shellpilot.core.workflow import WorkflowEngine
+        from shellpilot.core.prompts import build_workflow_prompt
 
         # Initialize workflow system
         llm_manager = LLMManager(config)
@@ -356,44 +579,16 @@ def workflow(
         context = session_store.get_context_summary()
 
         # Enhanced prompt for better workflow planning
-        workflow_prompt = f"""
-MULTI-STEP WORKFLOW PLANNING:
-
-Task: {query}
-
-Please create a comprehensive step-by-step plan for this complex task. Structure your response with clear phases:
-
-### Step 1: [Phase Name]
-Brief description of what this phase accomplishes.
-```bash
-command1
-command2
-```
-
-### Step 2: [Phase Name]
-Brief description of what this phase accomplishes.
-```bash
-command3
-command4
-```
-
-Important considerations:
-1. Break down into logical, sequential phases
-2. Each step should have clear dependencies
-3. Include verification commands where appropriate
-4. Consider error handling and rollback scenarios
-5. Use safe, standard Linux practices
-6. Include explanations for complex operations
-
-Context from recent session:
-{context if context and "No previous commands" not in context else "No previous session context."}
-"""
+        workflow_prompt = build_workflow_prompt(query, context)
 
         # Generate comprehensive workflow plan
         console.print(f"[cyan]🧠 Planning multi-step workflow:[/cyan] {query}")
         console.print("[dim]Analyzing task complexity and dependencies...[/dim]")
 
-        llm_response = llm_manager.generate_command(workflow_prompt)
+        llm_response = _generate_with_preview(
+            llm_manager, "🧠 Workflow Intelligence & Planning",
+            workflow_prompt, use_cache=not no_cache
+        )
 
         if not llm_response.commands:
             console.print("[yellow]❌ Could not generate workflow plan.[/yellow]")
@@ -430,7 +625,7 @@ Context from recent session:
                 commands=llm_response.commands,
                 success=True,
                 ai_summary=f"Planned {len(workflow.steps)} step workflow",
-                execution_time=time.time() - start_time
+                execution_time=time.perf_counter() - start
             )
         else:
             # EXECUTE: Run the workflow
@@ -446,7 +641,7 @@ Context from recent session:
                 commands=llm_response.commands,
                 success=success,
                 ai_summary=f"Executed {successful_steps}/{len(workflow.steps)} workflow steps",
-                execution_time=time.time() - start_time
+                execution_time=time.perf_counter() - start
             )
 
             # Final success message
@@ -462,8 +657,10 @@ Context from recent session:
         raise typer.Exit(1)
     except Exception as e:
         console.print(f"\n[red]❌ Workflow error: {str(e)}[/red]")
-        import traceback
-        console.print(f"[dim]{traceback.format_exc()}[/dim]")
+        if log_level == LogLevel.debug:
+            console.print_exception()
+        else:
+            console.print("[dim]Run with --log-level debug for the full traceback[/dim]")
         raise typer.Exit(1)
 
 @app.command()
@@ -477,6 +674,11 @@ def context(
         False,
         "--clear",
         help="Clear session context"
+    ),
+    dump: bool = typer.Option(
+        False,
+        "--dump",
+        help="Print the stored session as formatted JSON"
     )
 ):
     """
@@ -487,25 +689,34 @@ def context(
         shellpilot context              # Show recent commands
         shellpilot context --full       # Show full session history
         shellpilot context --clear      # Clear session memory
+        shellpilot context --dump       # Dump session as pretty JSON
     """
+    from rich.markup import escape
+    from rich.table import Table
+    from shellpilot.ui.console import console
+    from shellpilot.core.session import get_session_store
+
     session_store = get_session_store()
 
     if clear:
         session_store.clear_session()
         return
 
+    if dump:
+        console.print_json(data=session_store.export_session())
+        return
+
     session_info = session_store.get_session_info()
 
     # Show session header
-    console.print(Panel(
-        f"[bold blue]Session Information[/bold blue]\n"
-        f"[cyan]Session ID:[/cyan] {session_info['session_id']}\n"
-        f"[cyan]Started:[/cyan] {session_info['start_time']}\n"
-        f"[cyan]Total Commands:[/cyan] {session_info['total_commands']}\n"
-        f"[cyan]Current Directory:[/cyan] {session_info['current_working_dir']}\n"
-        f"[cyan]Last Updated:[/cyan] {session_info['last_updated']}",
-        title="🧠 Session Context",
-        border_style="blue"
+    console.print(_render_header(
+        "🧠 Session Context", "Session Information", (
+            ("Session ID", session_info['session_id']),
+            ("Started", session_info['start_time']),
+            ("Total Commands", session_info['total_commands']),
+            ("Current Directory", session_info['current_working_dir']),
+            ("Last Updated", session_info['last_updated']),
+        ), "blue"
     ))
 
     # Show command history
@@ -515,25 +726,30 @@ def context(
         console.print("[dim]No commands in session history[/dim]")
         return
 
-    console.print(f"\n[bold]Recent Commands ({'Full History' if show_full else 'Last 10'}):[/bold]\n")
+    # One table, rendered and written once
+    table = Table(title=f"Recent Commands ({'Full History' if show_full else 'Last 10'})")
+    table.add_column("#", style="dim", no_wrap=True)
+    table.add_column("Status", no_wrap=True)
+    table.add_column("Time", style="dim", no_wrap=True)
+    table.add_column("Query", style="cyan")
+    table.add_column("Commands", style="dim")
+    table.add_column("Summary", style="dim italic")
 
     for i, cmd in enumerate(recent_commands, 1):
-        status_icon = "✅" if cmd.success else "❌"
-        timestamp = cmd.timestamp.split('T')[1][:8]  # Just time portion
-
-        console.print(f"{i:2d}. {status_icon} [{timestamp}] [cyan]{cmd.query}[/cyan]")
-
-        # Show commands executed
-        for j, command in enumerate(cmd.commands[:3]):  # Show max 3 commands
-            console.print(f"    └─ [dim]{command}[/dim]")
+        commands_preview = "\n".join(cmd.commands[:3])  # Show max 3 commands
         if len(cmd.commands) > 3:
-            console.print(f"    └─ [dim]... and {len(cmd.commands) - 3} more[/dim]")
-
-        # Show AI summary if available
-        if cmd.ai_summary:
-            console.print(f"    [dim italic]Summary: {cmd.ai_summary}[/dim italic]")
+            commands_preview += f"\n... and {len(cmd.commands) - 3} more"
+
+        table.add_row(
+            str(i),
+            "✅" if cmd.success else "❌",
+            cmd.timestamp.partition('T')[2][:8],  # Just time portion
+            escape(cmd.query),
+            escape(commands_preview),
+            escape(cmd.ai_summary or "")
+        )
 
-        console.print()  # Empty line between commands
+    console.print(table)
 
 @app.command()
 def chat(
@@ -567,15 +783,19 @@ def chat(
         shellpilot chat --provider deepseek
         shellpilot chat --unsafe --model deepseek-chat
     """
+    from shellpilot.ui.console import console
+    from shellpilot.config import get_config
+
     try:
         # Load configuration
         config = get_config()
 
         # Override config with CLI options if provided
-        if provider:
-            config.set_default_provider(provider.value)
-        if model:
-            config.set_default_model(model)
+        with config.batch():
+            if provider:
+                config.set_default_provider(provider.value)
+            if model:
+                config.set_default_model(model)
 
         console.print("[yellow]⚠️  Interactive chat not implemented yet![/yellow]")
         console.print(f"[dim]Provider: {config.get_default_provider()}[/dim]")
@@ -626,6 +846,9 @@ def config(
         shellpilot config --set-model deepseek-chat
         shellpilot config --set-api-key your-api-key
     """
+    from shellpilot.ui.console import console
+    from shellpilot.config import get_config
+
     config_obj = get_config()
 
     if reset:
@@ -633,20 +856,21 @@ def config(
         console.print("[green]✅ Configuration reset to defaults[/green]")
         return
 
-    if set_provider:
-        config_obj.set_default_provider(set_provider.value)
-        console.print(f"[green]✅ Default provider set to {set_provider.value}[/green]")
+    with config_obj.batch():
+        if set_provider:
+            config_obj.set_default_provider(set_provider.value)
+            console.print(f"[green]✅ Default provider set to {set_provider.value}[/green]")
 
-    if set_model:
-        config_obj.set_default_model(set_model)
-        console.print(f"[green]✅ Default model set to {set_model}[/green]")
+        if set_model:
+            config_obj.set_default_model(set_model)
+            console.print(f"[green]✅ Default model set to {set_model}[/green]")
 
-    if api_key:
-        provider = config_obj.get_default_provider()
-        config_obj.set_api_key(provider, api_key)
-        console.print(f"[green]✅ API key set for {provider}[/green]")
+        if api_key:
+            provider = config_obj.get_default_provider()
+            config_obj.set_api_key(provider, api_key)
+            console.print(f"[green]✅ API key set for {provider}[/green]")
 
-    if show or not any([set_provider, set_model, api_key, reset]):
+    if show or not (set_provider or set_model or api_key or reset):
         config_obj.show()
 
 if __name__ == "__main__":
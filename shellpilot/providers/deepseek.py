@@ -4,37 +4,54 @@ DeepSeek provider for ShellPilot
 
 import httpx
 import json
-from typing import Dict, Any, Optional
-from rich.console import Console
+import threading
+from typing import Callable, Dict, Any, List, Optional
 
 from shellpilot.core.llm import LLMProvider, LLMResponse
 
-console = Console()
+from shellpilot.ui.console import console
 
-class DeepSeekProvider(LLMProvider):
-    """DeepSeek LLM provider implementation"""
+# Sent as the system message of every request; see get_system_prompt
+_SYSTEM_PROMPT = """You are ShellPilot, an expert Linux system administrator AI assistant.
 
-    def __init__(self, api_key: str, model: str = "deepseek/deepseek-chat", **kwargs):
-        super().__init__(api_key, model, **kwargs)
-        # Use OpenRouter endpoint instead of direct DeepSeek
-        self.base_url = kwargs.get('base_url', 'https://openrouter.ai/api')
-        self.api_version = kwargs.get('api_version', 'v1')
+Your role is to help users accomplish Linux system administration tasks by providing safe, accurate commands.
 
-    def generate_command(self, query: str, context: Optional[Dict[str, Any]] = None) -> LLMResponse:
-        """Generate command using DeepSeek API"""
-        try:
-            # Prepare the request
-            headers = {
-                'Authorization': f'Bearer {self.api_key}',
-                'Content-Type': 'application/json'
-            }
+Core principles:
+1. Always prioritize safety - avoid destructive commands
+2. Provide clear explanations for each command
+3. Use standard Linux utilities (apt, yum, systemctl, docker, etc.)
+4. Format commands in ```bash code blocks
+5. Include warnings for potentially risky operations
+6. Break complex tasks into clear steps
+
+Response format:
+- Brief explanation of the task
+- Step-by-step commands in ```bash blocks
+- Explanation of what each command does
+- Any relevant warnings or notes
+
+Example response:
+"I'll help you check system memory usage.
+
+```bash
+free -h
+```
 
-            # System prompt optimized for DeepSeek
-            system_prompt = self.get_system_prompt()
+This command displays memory usage in human-readable format showing total, used, and available memory.
 
-            # Enhanced user prompt
-            user_prompt = f"""
-Please help me with this Linux system administration task: {query}
+```bash
+top -n 1 | head -20
+```
+
+This shows the top processes by memory usage to identify any memory-heavy applications."
+
+Always be helpful, accurate, and safety-conscious."""
+
+# Fixed instructions sent ahead of every query. Keeping the variable task
+# at the very end leaves the system prompt and this block as an identical
+# prefix across requests, which the API can serve from its prompt cache
+_USER_PROMPT_PREFIX = """
+Please help me with the Linux system administration task given at the end.
 
 Requirements:
 1. Provide clear, safe Linux commands
@@ -46,72 +63,206 @@ Requirements:
 If the task involves multiple steps, break them down clearly.
 """
 
-            payload = {
-                "model": self.model,
-                "messages": [
-                    {"role": "system", "content": system_prompt},
-                    {"role": "user", "content": user_prompt}
-                ],
-                "max_tokens": self.max_tokens,
-                "temperature": self.temperature,
-                "stream": False
-            }
-
-            # Make the API request
-            with httpx.Client(timeout=self.timeout) as client:
-                response = client.post(
-                    f"{self.base_url}/{self.api_version}/chat/completions",
-                    headers=headers,
-                    json=payload
-                )
-
-                response.raise_for_status()
-                result = response.json()
-
-                # Extract response content
-                content = result['choices'][0]['message']['content']
-
-                # Extract commands from the response
-                commands = self._extract_commands(content)
-                commands = self._validate_commands(commands)
+# Streamed chunks to collect before passing the text on; redrawing on
+# every token would cost more than the stream itself
+_STREAM_CHUNKS_PER_UPDATE = 32
 
-                return LLMResponse(
-                    content=content,
-                    commands=commands,
-                    raw_response=json.dumps(result, indent=2)
-                )
+class DeepSeekProvider(LLMProvider):
+    """DeepSeek LLM provider implementation"""
 
-        except httpx.HTTPStatusError as e:
-            error_msg = f"DeepSeek API error: {e.response.status_code}"
+    def __init__(self, api_key: str, model: str = "deepseek/deepseek-chat", **kwargs):
+        super().__init__(api_key, model, **kwargs)
+        # Use OpenRouter endpoint instead of direct DeepSeek
+        self.base_url = kwargs.get('base_url', 'https://openrouter.ai/api')
+        self.api_version = kwargs.get('api_version', 'v1')
+        # Identical for every request, so built once
+        self._headers = {
+            'Authorization': f'Bearer {self.api_key}',
+            'Content-Type': 'application/json'
+        }
+        # Created on first request and kept, so later requests reuse its
+        # pooled connections instead of redoing the TLS handshake
+        self._client: Optional[httpx.Client] = None
+        # The same for agenerate_command; bound to the event loop that first
+        # uses it, which for the web server is the only one
+        self._async_client: Optional[httpx.AsyncClient] = None
+        # Batches and the web server's threadpool make first requests from
+        # several threads at once; only one of them may create each client
+        self._client_lock = threading.Lock()
+
+    def _get_client(self) -> httpx.Client:
+        """HTTP client shared by every request this provider makes"""
+        if self._client is None:
+            with self._client_lock:
+                if self._client is None:
+                    self._client = httpx.Client(timeout=self.timeout)
+        return self._client
+
+    def _get_async_client(self) -> httpx.AsyncClient:
+        """Async counterpart of _get_client"""
+        if self._async_client is None:
+            with self._client_lock:
+                if self._async_client is None:
+                    self._async_client = httpx.AsyncClient(timeout=self.timeout)
+        return self._async_client
+
+    async def aclose(self) -> None:
+        if self._async_client is not None:
+            await self._async_client.aclose()
+            self._async_client = None
+
+    def warm_up(self) -> None:
+        """Open the TLS connection on a background thread"""
+        if self._client is not None:
+            # Connected already, or the first request is connecting
+            return
+        client = self._get_client()
+
+        def connect() -> None:
             try:
-                error_detail = e.response.json()
+                client.head(self.base_url, timeout=2)
+            except httpx.HTTPError:
+                pass
+
+        threading.Thread(target=connect, daemon=True).start()
+
+    def _endpoint(self) -> str:
+        return f"{self.base_url}/{self.api_version}/chat/completions"
+
+    def _chat_payload(self, query: str, stream: bool) -> Dict[str, Any]:
+        """Request body for a command-generation chat completion"""
+        # System prompt optimized for DeepSeek
+        system_prompt = self.get_system_prompt()
+
+        # Enhanced user prompt, static part first (see _USER_PROMPT_PREFIX)
+        user_prompt = f"{_USER_PROMPT_PREFIX}\nTask: {query}\n"
+
+        return {
+            "model": self.model,
+            "messages": [
+                {"role": "system", "content": system_prompt},
+                {"role": "user", "content": user_prompt}
+            ],
+            "max_tokens": self.max_tokens,
+            "temperature": self.temperature,
+            "stream": stream
+        }
+
+    def _build_response(self, content: str, raw_response: Optional[str] = None) -> LLMResponse:
+        """Extract and validate the commands in a finished response"""
+        commands = self._extract_commands(content)
+        commands = self._validate_commands(commands)
+
+        return LLMResponse(
+            content=content,
+            commands=commands,
+            raw_response=raw_response
+        )
+
+    def _error_response(self, error: Exception) -> LLMResponse:
+        """Report a failed request and wrap it as a command-less response"""
+        if isinstance(error, httpx.HTTPStatusError):
+            error_msg = f"DeepSeek API error: {error.response.status_code}"
+            try:
+                error_detail = error.response.json()
                 error_msg += f" - {error_detail.get('error', {}).get('message', 'Unknown error')}"
             except:
-                error_msg += f" - {e.response.text}"
+                error_msg += f" - {error.response.text}"
 
             console.print(f"[red]API Error: {error_msg}[/red]")
-            return LLMResponse(
-                content=f"Error: {error_msg}",
-                commands=[],
-                raw_response=str(e)
+        else:
+            error_msg = str(error)
+            console.print(f"[red]Unexpected error: {error_msg}[/red]")
+
+        return LLMResponse(
+            content=f"Error: {error_msg}",
+            commands=[],
+            raw_response=str(error)
+        )
+
+    def generate_command(self, query: str, context: Optional[Dict[str, Any]] = None) -> LLMResponse:
+        """Generate command using DeepSeek API"""
+        try:
+            # Make the API request
+            response = self._get_client().post(
+                self._endpoint(),
+                headers=self._headers,
+                json=self._chat_payload(query, stream=False)
             )
 
+            response.raise_for_status()
+            result = response.json()
+
+            # Extract response content
+            content = result['choices'][0]['message']['content']
+
+            return self._build_response(content, response.text)
+
         except Exception as e:
-            console.print(f"[red]Unexpected error: {str(e)}[/red]")
-            return LLMResponse(
-                content=f"Error: {str(e)}",
-                commands=[],
-                raw_response=str(e)
+            return self._error_response(e)
+
+    async def agenerate_command(self, query: str) -> LLMResponse:
+        """Generate command using DeepSeek API without blocking the event loop"""
+        try:
+            response = await self._get_async_client().post(
+                self._endpoint(),
+                headers=self._headers,
+                json=self._chat_payload(query, stream=False)
             )
 
+            response.raise_for_status()
+            result = response.json()
+
+            content = result['choices'][0]['message']['content']
+
+            return self._build_response(content, response.text)
+
+        except Exception as e:
+            return self._error_response(e)
+
+    def generate_command_stream(self, query: str, on_text: Callable[[str], None]) -> LLMResponse:
+        """Generate command over a streamed response, reporting text as it arrives"""
+        try:
+            chunks: List[str] = []
+            unreported = 0
+
+            with self._get_client().stream(
+                "POST",
+                self._endpoint(),
+                headers=self._headers,
+                json=self._chat_payload(query, stream=True)
+            ) as response:
+                if response.is_error:
+                    # Load the body so the error handler can read its message
+                    response.read()
+                response.raise_for_status()
+
+                # Server-sent events; other lines are keep-alive comments
+                for line in response.iter_lines():
+                    if not line.startswith("data: "):
+                        continue
+                    data = line[6:]
+                    if data == "[DONE]":
+                        break
+
+                    delta = json.loads(data)['choices'][0].get('delta', {}).get('content')
+                    if delta:
+                        chunks.append(delta)
+                        unreported += 1
+                        if unreported >= _STREAM_CHUNKS_PER_UPDATE:
+                            on_text("".join(chunks))
+                            unreported = 0
+
+            content = "".join(chunks)
+            on_text(content)
+            return self._build_response(content)
+
+        except Exception as e:
+            return self._error_response(e)
+
     def validate_config(self) -> bool:
         """Validate DeepSeek configuration"""
         try:
-            headers = {
-                'Authorization': f'Bearer {self.api_key}',
-                'Content-Type': 'application/json'
-            }
-
             # Simple test request
             payload = {
                 "model": self.model,
@@ -121,14 +272,14 @@ If the task involves multiple steps, break them down clearly.
                 "max_tokens": 10
             }
 
-            with httpx.Client(timeout=10) as client:
-                response = client.post(
-                    f"{self.base_url}/{self.api_version}/chat/completions",
-                    headers=headers,
-                    json=payload
-                )
+            response = self._get_client().post(
+                self._endpoint(),
+                headers=self._headers,
+                json=payload,
+                timeout=10
+            )
 
-                return response.status_code == 200
+            return response.status_code == 200
 
         except Exception as e:
             console.print(f"[red]Configuration validation failed: {e}[/red]")
@@ -136,37 +287,4 @@ If the task involves multiple steps, break them down clearly.
 
     def get_system_prompt(self) -> str:
         """Get system prompt optimized for DeepSeek"""
-        return """You are ShellPilot, an expert Linux system administrator AI assistant.
-
-Your role is to help users accomplish Linux system administration tasks by providing safe, accurate commands.
-
-Core principles:
-1. Always prioritize safety - avoid destructive commands
-2. Provide clear explanations for each command
-3. Use standard Linux utilities (apt, yum, systemctl, docker, etc.)
-4. Format commands in ```bash code blocks
-5. Include warnings for potentially risky operations
-6. Break complex tasks into clear steps
-
-Response format:
-- Brief explanation of the task
-- Step-by-step commands in ```bash blocks
-- Explanation of what each command does
-- Any relevant warnings or notes
-
-Example response:
-"I'll help you check system memory usage.
-
-```bash
-free -h
-```
-
-This command displays memory usage in human-readable format showing total, used, and available memory.
-
-```bash
-top -n 1 | head -20
-```
-
-This shows the top processes by memory usage to identify any memory-heavy applications."
-
-Always be helpful, accurate, and safety-conscious."""
\ No newline at end of file
+        return _SYSTEM_PROMPT
\ No newline at end of file
@@ -0,0 +1,10 @@
+"""
+Shared Rich console for ShellPilot
+"""
+
+from typing import Final
+
+from rich.console import Console
+
+# Single console instance reused by every module; never rebound
+console: Final[Console] = Console()
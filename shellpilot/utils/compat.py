@@ -0,0 +1,10 @@
+"""
+Python version compatibility helpers for ShellPilot
+"""
+
+import sys
+from typing import Any, Dict
+
+# dataclass(slots=True) only exists from Python 3.10; older versions fall
+# back to regular dataclasses
+DATACLASS_SLOTS: Dict[str, Any] = {"slots": True} if sys.version_info >= (3, 10) else {}
@@ -2,30 +2,61 @@
 Commands API endpoints for ShellPilot Web Interface
 """
 
-from fastapi import APIRouter, HTTPException, BackgroundTasks
-from typing import List, Dict, Any
-import time
+from fastapi import APIRouter, HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from typing import AsyncIterator, List, Dict, Any
 import asyncio
+import functools
+import time
 
 from shellpilot.config import get_config
 from shellpilot.core.session import get_session_store
 from shellpilot.core.llm import LLMManager
-from shellpilot.core.executor import CommandExecutor
+from shellpilot.core.executor import CommandExecutor, ExecutionResult
 from shellpilot.core.safety import SafetyChecker
 from shellpilot.core.workflow import WorkflowEngine
+from shellpilot.utils.serialization import json_dumps
 
-from .models import CommandRequest, CommandResponse, WebSocketMessage
+from .models import CommandRequest, CommandResponse
 
 router = APIRouter()
 
-@router.post("/run", response_model=CommandResponse)
-async def execute_command(request: CommandRequest):
-    """Execute a ShellPilot command via API"""
-    start_time = time.time()
+async def _execution_results(
+    executor: CommandExecutor, commands: List[str]
+) -> AsyncIterator[ExecutionResult]:
+    """Run commands off the event loop, yielding each result once it's ready
+
+    A batch that may run in parallel is reported when it has all finished.
+    """
+    loop = asyncio.get_running_loop()
+    if executor.can_run_parallel(commands):
+        batch = await loop.run_in_executor(
+            None, functools.partial(executor.execute_multiple, commands, parallel=True)
+        )
+        for result in batch:
+            yield result
+        return
+
+    results = executor.iter_execute(commands)
+    while True:
+        result = await loop.run_in_executor(None, next, results, None)
+        if result is None:
+            return
+        yield result
+
+async def _run_events(request: CommandRequest) -> AsyncIterator[Dict[str, Any]]:
+    """Run a query, yielding events as the work progresses
+
+    "analysis" once the AI has answered, "result" per finished command or
+    workflow step, and "complete" last, carrying the CommandResponse.
+    """
+    start = time.perf_counter()
+    # Outside the try so the error handler below can always record to it
+    session_store = get_session_store()
 
     try:
         # Initialize components
-        session_store = get_session_store()
         config = get_config()
 
         # Clear context if requested
@@ -33,10 +64,11 @@ async def execute_command(request: CommandRequest):
             session_store.clear_session()
 
         # Override config with request parameters
-        if request.provider:
-            config.set_default_provider(request.provider.value)
-        if request.model:
-            config.set_default_model(request.model)
+        with config.batch():
+            if request.provider:
+                config.set_default_provider(request.provider.value)
+            if request.model:
+                config.set_default_model(request.model)
 
         # Initialize core components
         llm_manager = LLMManager(config)
@@ -46,31 +78,40 @@ async def execute_command(request: CommandRequest):
         context = session_store.get_context_summary()
 
         # Generate commands using AI
-        llm_response = llm_manager.generate_command(
+        llm_response = await llm_manager.agenerate_command(
             request.query,
-            context if context and "No previous commands" not in context else None
+            context if context and "No previous commands" not in context else None,
+            use_cache=request.cache
         )
 
         if not llm_response.commands:
             # Record failed attempt
+            elapsed = time.perf_counter() - start
             session_store.add_command(
                 query=request.query,
                 commands=[],
                 success=False,
                 ai_summary="No commands generated",
-                execution_time=time.time() - start_time
+                execution_time=elapsed
             )
 
-            return CommandResponse(
+            yield {"event": "complete", "response": CommandResponse(
                 success=False,
                 query=request.query,
                 ai_analysis=llm_response.content,
                 commands=[],
                 execution_results=[],
-                session_id=session_store.get_session_info()["session_id"],
-                execution_time=time.time() - start_time,
+                session_id=session_store.get_session_id(),
+                execution_time=elapsed,
                 mode="standard"
-            )
+            )}
+            return
+
+        yield {
+            "event": "analysis",
+            "ai_analysis": llm_response.content,
+            "commands": llm_response.commands
+        }
 
         # Determine execution mode
         is_workflow = request.workflow_mode or len(llm_response.commands) > 6
@@ -90,18 +131,23 @@ async def execute_command(request: CommandRequest):
             # For API, auto-approve if not in safe mode or if dry run
             auto_approve = not request.safe_mode or request.dry_run
 
-            success = workflow_engine.execute_workflow(workflow, interactive=False)
+            # Blocking, so run off the event loop
+            success = await asyncio.get_running_loop().run_in_executor(
+                None, functools.partial(workflow_engine.execute_workflow, workflow, interactive=False)
+            )
 
             # Convert workflow results to execution results
             for step in workflow.steps:
-                execution_results.append({
+                step_result = {
                     "step_name": step.name,
                     "commands": step.commands,
                     "status": step.status.value,
                     "success": step.status.value == "success",
                     "error_message": step.error_message,
                     "output": step.output
-                })
+                }
+                execution_results.append(step_result)
+                yield {"event": "result", "result": step_result}
 
             successful_steps = sum(1 for step in workflow.steps if step.status.value == "success")
             total_steps = len(workflow.steps)
@@ -110,18 +156,21 @@ async def execute_command(request: CommandRequest):
 
         else:
             # Standard execution
-            results = executor.execute_multiple(llm_response.commands)
+            results = []
+            async for result in _execution_results(executor, llm_response.commands):
+                results.append(result)
 
-            # Convert to API format
-            for i, result in enumerate(results):
-                execution_results.append({
+                # Convert to API format
+                command_result = {
                     "command": result.command,
                     "success": result.success,
                     "exit_code": result.exit_code,
                     "stdout": result.stdout,
                     "stderr": result.stderr,
                     "execution_time": result.execution_time
-                })
+                }
+                execution_results.append(command_result)
+                yield {"event": "result", "result": command_result}
 
             overall_success = all(r.success for r in results)
             mode = "standard"
@@ -129,42 +178,63 @@ async def execute_command(request: CommandRequest):
         # Create AI summary
         ai_summary = f"Executed via API - {mode} mode"
         if llm_response.content:
-            first_sentence = llm_response.content.split('.')[0]
+            first_sentence = llm_response.content.partition('.')[0]
             if len(first_sentence) < 100:
                 ai_summary = first_sentence.strip()
 
         # Record in session
+        elapsed = time.perf_counter() - start
         session_store.add_command(
             query=request.query,
             commands=llm_response.commands,
             success=overall_success,
             ai_summary=ai_summary,
-            execution_time=time.time() - start_time
+            execution_time=elapsed
         )
 
-        return CommandResponse(
+        yield {"event": "complete", "response": CommandResponse(
             success=overall_success,
             query=request.query,
             ai_analysis=llm_response.content,
             commands=llm_response.commands,
             execution_results=execution_results,
-            session_id=session_store.get_session_info()["session_id"],
-            execution_time=time.time() - start_time,
+            session_id=session_store.get_session_id(),
+            execution_time=elapsed,
             mode=mode
-        )
+        )}
 
     except Exception as e:
         # Record error in session
+        elapsed = time.perf_counter() - start
         session_store.add_command(
             query=request.query,
             commands=[],
             success=False,
             ai_summary=f"API Error: {str(e)}",
-            execution_time=time.time() - start_time
+            execution_time=elapsed
         )
 
         raise HTTPException(status_code=500, detail=str(e))
 
+@router.post("/run", response_model=CommandResponse)
+async def execute_command(request: CommandRequest):
+    """Execute a ShellPilot command via API"""
+    async for event in _run_events(request):
+        if event["event"] == "complete":
+            return event["response"]
+
+@router.post("/run/stream")
+async def execute_command_stream(request: CommandRequest):
+    """Execute a ShellPilot command, streaming progress as server-sent events"""
+    async def stream() -> AsyncIterator[bytes]:
+        try:
+            async for event in _run_events(request):
+                yield b"data: " + json_dumps(jsonable_encoder(event)) + b"\n\n"
+        except HTTPException as e:
+            yield b"data: " + json_dumps({"event": "error", "detail": e.detail}) + b"\n\n"
+
+    return StreamingResponse(stream(), media_type="text/event-stream")
+
 @router.get("/test-simple")
 async def test_simple_command():
     """Test endpoint for simple command execution"""
@@ -175,7 +245,7 @@ async def test_simple_command():
 
         return {
             "status": "ready",
-            "session_id": session_store.get_session_info()["session_id"],
+            "session_id": session_store.get_session_id(),
             "provider": config.get_default_provider(),
             "model": config.get_default_model(),
             "message": "Command API is ready to execute commands"
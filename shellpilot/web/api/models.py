@@ -23,6 +23,7 @@ class CommandRequest(BaseModel):
     dry_run: bool = Field(False, description="Show commands without executing")
     workflow_mode: bool = Field(False, description="Force workflow mode")
     clear_context: bool = Field(False, description="Clear session context first")
+    cache: bool = Field(True, description="Reuse a cached AI response for a repeated query")
 
 class WorkflowRequest(BaseModel):
     """Request to execute a workflow"""
@@ -32,6 +33,8 @@ class WorkflowRequest(BaseModel):
     safe_mode: bool = Field(True, description="Enable safety confirmations")
     dry_run: bool = Field(False, description="Show workflow plan only")
     auto_approve: bool = Field(False, description="Auto-approve non-critical steps")
+    cache: bool = Field(True, description="Reuse a cached AI plan for a repeated task")
+    background: bool = Field(False, description="Return once planned and stream step progress over /ws")
 
 class CommandResponse(BaseModel):
     """Response from command execution"""
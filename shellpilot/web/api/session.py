@@ -2,23 +2,55 @@
 Session API endpoints for ShellPilot Web Interface
 """
 
-from fastapi import APIRouter, HTTPException
-from typing import List
+import base64
+import hashlib
+
+from fastapi import APIRouter, HTTPException, Query, Request, Response
+from typing import List, Literal, Optional
 
 from shellpilot.core.session import get_session_store
+from shellpilot.utils.serialization import json_dumps, json_loads
 
 from .models import SessionResponse, SessionInfo, CommandHistory
 
 router = APIRouter()
 
+def _session_etag(session_info: dict, *params) -> str:
+    """ETag for a session view: it changes whenever a command is recorded
+    or the session is cleared, and differs per set of query parameters"""
+    key = json_dumps([
+        session_info["session_id"],
+        session_info["last_updated"],
+        session_info["total_commands"],
+        *params
+    ])
+    return f'"{hashlib.blake2b(key, digest_size=8).hexdigest()}"'
+
+def _not_modified(request: Request, etag: str) -> bool:
+    """Whether the client's If-None-Match already names this ETag"""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    tags = {tag.strip() for tag in header.split(",")}
+    return etag in tags or f"W/{etag}" in tags or "*" in tags
+
 @router.get("/session", response_model=SessionResponse)
-async def get_session_context():
-    """Get current session context and command history"""
+async def get_session_context(request: Request, response: Response):
+    """Get current session context and command history
+
+    Polling clients should send the previous ETag as If-None-Match; an
+    unchanged session answers 304 without rebuilding the body.
+    """
     try:
         session_store = get_session_store()
 
         # Get session info
         session_info_dict = session_store.get_session_info()
+        etag = _session_etag(session_info_dict)
+        if _not_modified(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+
         session_info = SessionInfo(
             session_id=session_info_dict["session_id"],
             start_time=session_info_dict["start_time"],
@@ -54,13 +86,42 @@ async def get_session_context():
         raise HTTPException(status_code=500, detail=str(e))
 
 @router.get("/session/history")
-async def get_full_history(limit: int = 20):
-    """Get full command history"""
+async def get_full_history(
+    request: Request,
+    response: Response,
+    limit: int = Query(20, ge=1, le=50),  # the store keeps the last 50
+    offset: int = Query(0, ge=0),
+    status: Optional[Literal["success", "failed"]] = None,
+    cursor: Optional[str] = None
+):
+    """Get full command history
+
+    offset pages back from the newest command; status filters by outcome.
+    For stable paging pass the previous page's next_cursor as cursor.
+    Like /session, answers 304 when If-None-Match matches the ETag.
+    """
+    before = None
+    if cursor is not None:
+        try:
+            before = json_loads(base64.urlsafe_b64decode(cursor))["before_ts"]
+        except (ValueError, KeyError, TypeError):
+            raise HTTPException(status_code=400, detail="Invalid cursor")
+
     try:
         session_store = get_session_store()
 
-        # Get recent commands with limit
-        recent_commands_data = session_store.get_recent_commands(limit)
+        etag = _session_etag(session_store.get_session_info(), limit, offset, status, cursor)
+        if _not_modified(request, etag):
+            return Response(status_code=304, headers={"ETag": etag})
+        response.headers["ETag"] = etag
+
+        # Get recent commands with limit, filtered in the store
+        recent_commands_data = session_store.get_recent_commands(
+            limit,
+            offset=offset,
+            success=None if status is None else status == "success",
+            before=before
+        )
         history = []
 
         for cmd in recent_commands_data:
@@ -71,13 +132,23 @@ async def get_full_history(limit: int = 20):
                 "success": cmd.success,
                 "ai_summary": cmd.ai_summary,
                 "execution_time": cmd.execution_time,
-                "working_dir": cmd.working_dir
+                "working_dir": cmd.working_dir,
+                "kind": cmd.kind
             })
 
+        # A full page may have older commands behind it; continue from
+        # the oldest one returned
+        next_cursor = None
+        if history and len(history) == limit:
+            next_cursor = base64.urlsafe_b64encode(
+                json_dumps({"before_ts": history[0]["timestamp"]})
+            ).decode()
+
         return {
             "total_commands": len(history),
-            "session_id": session_store.get_session_info()["session_id"],
-            "history": history
+            "session_id": session_store.get_session_id(),
+            "history": history,
+            "next_cursor": next_cursor
         }
 
     except Exception as e:
@@ -93,7 +164,7 @@ async def clear_session():
         return {
             "success": True,
             "message": "Session context cleared",
-            "new_session_id": session_store.get_session_info()["session_id"]
+            "new_session_id": session_store.get_session_id()
         }
 
     except Exception as e:
@@ -105,30 +176,21 @@ async def get_session_stats():
     try:
         session_store = get_session_store()
         session_info = session_store.get_session_info()
-        recent_commands = session_store.get_recent_commands(50)  # Last 50 for stats
-
-        # Calculate stats
-        successful_commands = sum(1 for cmd in recent_commands if cmd.success)
-        failed_commands = len(recent_commands) - successful_commands
-
-        # Average execution time
-        total_time = sum(cmd.execution_time for cmd in recent_commands)
-        avg_execution_time = total_time / len(recent_commands) if recent_commands else 0
-
-        # Command types
-        workflow_commands = sum(1 for cmd in recent_commands if "WORKFLOW" in cmd.query)
-        standard_commands = len(recent_commands) - workflow_commands
+        stats = session_store.get_stats(50)  # Last 50 for stats
+        count = stats["count"]
+        successful_commands = stats["successful"]
+        avg_execution_time = stats["total_execution_time"] / count if count else 0
 
         return {
             "session_id": session_info["session_id"],
             "session_start": session_info["start_time"],
             "total_commands": session_info["total_commands"],
             "successful_commands": successful_commands,
-            "failed_commands": failed_commands,
-            "success_rate": (successful_commands / len(recent_commands) * 100) if recent_commands else 0,
+            "failed_commands": stats["failed"],
+            "success_rate": (successful_commands / count * 100) if count else 0,
             "average_execution_time": round(avg_execution_time, 2),
-            "workflow_commands": workflow_commands,
-            "standard_commands": standard_commands,
+            "workflow_commands": stats["workflow"],
+            "standard_commands": stats["standard"],
             "current_directory": session_info["current_working_dir"],
             "last_activity": session_info["last_updated"]
         }
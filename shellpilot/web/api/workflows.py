@@ -2,89 +2,201 @@
 Workflows API endpoints for ShellPilot Web Interface
 """
 
-from fastapi import APIRouter, HTTPException
+from fastapi import APIRouter, HTTPException, Response
 from typing import List, Dict, Any
+from collections import Counter
+import asyncio
+import functools
 import time
+import uuid
 
 from shellpilot.config import get_config
 from shellpilot.core.session import get_session_store
 from shellpilot.core.llm import LLMManager
 from shellpilot.core.executor import CommandExecutor
-from shellpilot.core.safety import SafetyChecker
-from shellpilot.core.workflow import WorkflowEngine
+from shellpilot.core.workflow import StepStatus, WorkflowEngine
+from shellpilot.core.prompts import build_workflow_prompt
 
+from ..connections import manager
 from .models import WorkflowRequest, WorkflowResponse
 
 router = APIRouter()
 
+# How often a background run checks its steps for status changes
+_STEP_POLL_INTERVAL = 0.25
+# Finished background runs kept around for GET /workflow/{id}
+_MAX_WORKFLOW_RUNS = 100
+
+# Background runs by workflow id; tasks are held so they aren't collected mid-run
+_workflow_runs: Dict[str, Dict[str, Any]] = {}
+_background_tasks = set()
+
+def _step_data(step) -> Dict[str, Any]:
+    """Serialize an executed (or executing) workflow step"""
+    return {
+        "id": step.id,
+        "name": step.name,
+        "description": step.description,
+        "commands": step.commands,
+        "depends_on": step.depends_on,
+        "status": step.status.value,
+        "error_message": step.error_message,
+        "output": step.output,
+        "retry_count": step.retry_count
+    }
+
+def _finish_execution(request, llm_response, workflow, success, session_store, start, workflow_id):
+    """Summarize an executed workflow and record it in the session"""
+    steps_data = [_step_data(step) for step in workflow.steps]
+
+    # Execution summary
+    counts = Counter(step.status for step in workflow.steps)
+    successful_steps = counts[StepStatus.SUCCESS]
+    failed_steps = counts[StepStatus.FAILED]
+    skipped_steps = counts[StepStatus.SKIPPED]
+
+    execution_summary = {
+        "mode": "execution",
+        "total_steps": len(workflow.steps),
+        "successful_steps": successful_steps,
+        "failed_steps": failed_steps,
+        "skipped_steps": skipped_steps,
+        "overall_success": success
+    }
+
+    # Record execution in session
+    elapsed = time.perf_counter() - start
+    session_store.add_command(
+        query=f"[WORKFLOW] {request.query}",
+        commands=llm_response.commands,
+        success=success,
+        ai_summary=f"Executed {successful_steps}/{len(workflow.steps)} workflow steps",
+        execution_time=elapsed,
+        kind="workflow"
+    )
+
+    return WorkflowResponse(
+        success=success,
+        query=request.query,
+        ai_plan=llm_response.content,
+        workflow_id=workflow_id,
+        steps=steps_data,
+        execution_summary=execution_summary,
+        session_id=session_store.get_session_id(),
+        execution_time=elapsed
+    )
+
+async def _notify(message: Dict[str, Any]):
+    """Push a progress message to WebSocket clients; a dead socket must not stop the run"""
+    try:
+        await manager.broadcast_json(message)
+    except Exception:
+        pass
+
+def _register_run(workflow_id: str, workflow) -> Dict[str, Any]:
+    """Track a new background run, dropping the oldest finished ones over the cap"""
+    run = {"status": "running", "workflow": workflow, "response": None, "error": None}
+    _workflow_runs[workflow_id] = run
+
+    for old_id in list(_workflow_runs):
+        if len(_workflow_runs) <= _MAX_WORKFLOW_RUNS:
+            break
+        if _workflow_runs[old_id]["status"] != "running":
+            del _workflow_runs[old_id]
+
+    return run
+
+async def _run_in_background(workflow_id, request, llm_response, workflow, workflow_engine, session_store, start):
+    """Execute a planned workflow off the request, streaming step changes over /ws"""
+    run = _workflow_runs[workflow_id]
+    future = asyncio.get_running_loop().run_in_executor(
+        None, functools.partial(workflow_engine.execute_workflow, workflow, interactive=False)
+    )
+
+    # Steps are updated from the executor thread; report each change as it is seen
+    seen = {step.id: step.status for step in workflow.steps}
+    while True:
+        done, _ = await asyncio.wait({future}, timeout=_STEP_POLL_INTERVAL)
+        for step in workflow.steps:
+            if seen[step.id] != step.status:
+                seen[step.id] = step.status
+                await _notify({
+                    "type": "step",
+                    "workflow_id": workflow_id,
+                    "step_id": step.id,
+                    "status": step.status.value
+                })
+        if done:
+            break
+
+    try:
+        success = future.result()
+        run["response"] = _finish_execution(
+            request, llm_response, workflow, success, session_store, start, workflow_id
+        )
+        run["status"] = "success" if success else "failed"
+    except Exception as e:
+        session_store.add_command(
+            query=f"[WORKFLOW ERROR] {request.query}",
+            commands=[],
+            success=False,
+            ai_summary=f"Workflow API Error: {str(e)}",
+            execution_time=time.perf_counter() - start,
+            kind="workflow"
+        )
+        run["status"] = "error"
+        run["error"] = str(e)
+
+    await _notify({
+        "type": "workflow",
+        "workflow_id": workflow_id,
+        "status": run["status"],
+        "error": run["error"]
+    })
+
 @router.post("/workflow", response_model=WorkflowResponse)
-async def execute_workflow(request: WorkflowRequest):
+async def execute_workflow(request: WorkflowRequest, response: Response):
     """Execute a complex workflow via API"""
-    start_time = time.time()
+    start = time.perf_counter()
+    # Before the try for the same reason as in commands.py's _run_events
+    session_store = get_session_store()
 
     try:
         # Initialize components
-        session_store = get_session_store()
         config = get_config()
 
         # Override config with request parameters
-        if request.provider:
-            config.set_default_provider(request.provider.value)
-        if request.model:
-            config.set_default_model(request.model)
+        with config.batch():
+            if request.provider:
+                config.set_default_provider(request.provider.value)
+            if request.model:
+                config.set_default_model(request.model)
 
         # Initialize workflow system
         llm_manager = LLMManager(config)
-        safety_checker = SafetyChecker(request.safe_mode)
-        executor = CommandExecutor(safe_mode=request.safe_mode, dry_run=request.dry_run)
-        workflow_engine = WorkflowEngine(executor, safety_checker)
+        # Planning only parses the AI response; the executor and safety
+        # checker are attached once the workflow is actually going to run
+        workflow_engine = WorkflowEngine(None, None)
 
         # Get session context
         context = session_store.get_context_summary()
 
         # Enhanced prompt for workflow planning
-        workflow_prompt = f"""
-MULTI-STEP WORKFLOW PLANNING:
-
-Task: {request.query}
-
-Create a comprehensive step-by-step plan for this complex task. Structure with clear phases:
-
-### Step 1: [Phase Name]
-Brief description of what this phase accomplishes.
-```bash
-command1
-command2
-```
-
-### Step 2: [Phase Name]
-Brief description of what this phase accomplishes.
-```bash
-command3
-command4
-```
-
-Important considerations:
-1. Break down into logical, sequential phases
-2. Each step should have clear dependencies
-3. Include verification commands where appropriate
-4. Use safe, standard Linux practices
-
-Context from recent session:
-{context if context and "No previous commands" not in context else "No previous session context."}
-"""
+        workflow_prompt = build_workflow_prompt(request.query, context)
 
         # Generate workflow plan
-        llm_response = llm_manager.generate_command(workflow_prompt)
+        llm_response = await llm_manager.agenerate_command(workflow_prompt, use_cache=request.cache)
 
         if not llm_response.commands:
             # Record failed attempt
+            elapsed = time.perf_counter() - start
             session_store.add_command(
                 query=f"[WORKFLOW] {request.query}",
                 commands=[],
                 success=False,
                 ai_summary="No workflow plan generated",
-                execution_time=time.time() - start_time
+                execution_time=elapsed,
+                kind="workflow"
             )
 
             raise HTTPException(
@@ -101,24 +213,27 @@ Context from recent session:
 
         if request.dry_run:
             # Dry run - return plan only
-            steps_data = []
-            for step in workflow.steps:
-                steps_data.append({
+            steps_data = [
+                {
                     "id": step.id,
                     "name": step.name,
                     "description": step.description,
                     "commands": step.commands,
                     "depends_on": step.depends_on,
                     "status": "planned"
-                })
+                }
+                for step in workflow.steps
+            ]
 
             # Record planning in session
+            elapsed = time.perf_counter() - start
             session_store.add_command(
                 query=f"[WORKFLOW PLAN] {request.query}",
                 commands=llm_response.commands,
                 success=True,
                 ai_summary=f"Planned {len(workflow.steps)} step workflow",
-                execution_time=time.time() - start_time
+                execution_time=elapsed,
+                kind="workflow"
             )
 
             return WorkflowResponse(
@@ -132,76 +247,69 @@ Context from recent session:
                     "total_steps": len(workflow.steps),
                     "planned_commands": len(llm_response.commands)
                 },
-                session_id=session_store.get_session_info()["session_id"],
-                execution_time=time.time() - start_time
+                session_id=session_store.get_session_id(),
+                execution_time=elapsed
             )
 
-        else:
-            # Execute workflow
-            success = workflow_engine.execute_workflow(
-                workflow,
-                interactive=False  # Non-interactive for API
+        # Share the executor's safety checker instead of building a second one
+        executor = CommandExecutor(safe_mode=request.safe_mode)
+        workflow_engine.executor = executor
+        workflow_engine.safety_checker = executor.safety_checker
+
+        if request.background:
+            # Hand execution to a task and answer as soon as the plan is ready;
+            # the run id is unique even when the same task is submitted twice
+            workflow_id = f"{workflow.id}_{uuid.uuid4().hex[:8]}"
+            _register_run(workflow_id, workflow)
+            task = asyncio.ensure_future(_run_in_background(
+                workflow_id, request, llm_response, workflow, workflow_engine, session_store, start
+            ))
+            _background_tasks.add(task)
+            task.add_done_callback(_background_tasks.discard)
+
+            response.status_code = 202
+            return WorkflowResponse(
+                success=True,
+                query=request.query,
+                ai_plan=llm_response.content,
+                workflow_id=workflow_id,
+                steps=[_step_data(step) for step in workflow.steps],
+                execution_summary={
+                    "mode": "background",
+                    "status": "running",
+                    "total_steps": len(workflow.steps)
+                },
+                session_id=session_store.get_session_id(),
+                execution_time=time.perf_counter() - start
             )
 
-            # Prepare step results
-            steps_data = []
-            for step in workflow.steps:
-                steps_data.append({
-                    "id": step.id,
-                    "name": step.name,
-                    "description": step.description,
-                    "commands": step.commands,
-                    "depends_on": step.depends_on,
-                    "status": step.status.value,
-                    "error_message": step.error_message,
-                    "output": step.output,
-                    "retry_count": step.retry_count
-                })
-
-            # Execution summary
-            successful_steps = sum(1 for step in workflow.steps if step.status.value == "success")
-            failed_steps = sum(1 for step in workflow.steps if step.status.value == "failed")
-            skipped_steps = sum(1 for step in workflow.steps if step.status.value == "skipped")
-
-            execution_summary = {
-                "mode": "execution",
-                "total_steps": len(workflow.steps),
-                "successful_steps": successful_steps,
-                "failed_steps": failed_steps,
-                "skipped_steps": skipped_steps,
-                "overall_success": success
-            }
-
-            # Record execution in session
-            session_store.add_command(
-                query=f"[WORKFLOW] {request.query}",
-                commands=llm_response.commands,
-                success=success,
-                ai_summary=f"Executed {successful_steps}/{len(workflow.steps)} workflow steps",
-                execution_time=time.time() - start_time
+        else:
+            # Execute workflow; commands block, so keep them off the event loop
+            success = await asyncio.get_running_loop().run_in_executor(
+                None,
+                functools.partial(
+                    workflow_engine.execute_workflow,
+                    workflow,
+                    interactive=False  # Non-interactive for API
+                )
             )
 
-            return WorkflowResponse(
-                success=success,
-                query=request.query,
-                ai_plan=llm_response.content,
-                workflow_id=workflow.id,
-                steps=steps_data,
-                execution_summary=execution_summary,
-                session_id=session_store.get_session_info()["session_id"],
-                execution_time=time.time() - start_time
+            return _finish_execution(
+                request, llm_response, workflow, success, session_store, start, workflow.id
             )
 
     except HTTPException:
         raise
     except Exception as e:
         # Record error in session
+        elapsed = time.perf_counter() - start
         session_store.add_command(
             query=f"[WORKFLOW ERROR] {request.query}",
             commands=[],
             success=False,
             ai_summary=f"Workflow API Error: {str(e)}",
-            execution_time=time.time() - start_time
+            execution_time=elapsed,
+            kind="workflow"
         )
 
         raise HTTPException(status_code=500, detail=str(e))
@@ -216,7 +324,7 @@ async def test_workflow_endpoint():
         return {
             "status": "ready",
             "message": "Workflow API is ready to execute complex tasks",
-            "session_id": session_store.get_session_info()["session_id"],
+            "session_id": session_store.get_session_id(),
             "provider": config.get_default_provider(),
             "workflow_features": [
                 "Multi-step planning",
@@ -227,4 +335,19 @@ async def test_workflow_endpoint():
             ]
         }
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
+
+@router.get("/workflow/{workflow_id}")
+async def get_workflow_status(workflow_id: str):
+    """Poll a background workflow run"""
+    run = _workflow_runs.get(workflow_id)
+    if run is None:
+        raise HTTPException(status_code=404, detail=f"Unknown workflow: {workflow_id}")
+
+    return {
+        "workflow_id": workflow_id,
+        "status": run["status"],
+        "steps": [_step_data(step) for step in run["workflow"].steps],
+        "response": run["response"],
+        "error": run["error"]
+    }
@@ -0,0 +1,73 @@
+"""
+WebSocket connection tracking for ShellPilot Web Interface
+"""
+
+from fastapi import WebSocket
+from typing import Dict, Set
+import asyncio
+
+from shellpilot.utils.serialization import json_dumps
+
+# Broadcasts waiting on a slow client before its oldest ones are dropped
+_SEND_QUEUE_SIZE = 64
+
+# Clients beyond this are turned away, each costing a queue and a task
+_MAX_CONNECTIONS = 100
+
+# WebSocket connection manager
+class ConnectionManager:
+    def __init__(self):
+        self.active_connections: Set[WebSocket] = set()
+        # Each client drains its own queue, so a slow socket only delays itself
+        self._queues: Dict[WebSocket, asyncio.Queue] = {}
+        self._senders: Dict[WebSocket, asyncio.Task] = {}
+
+    async def connect(self, websocket: WebSocket) -> bool:
+        """Accept a client; False if it was turned away for being over the limit"""
+        await websocket.accept()
+        if len(self.active_connections) >= _MAX_CONNECTIONS:
+            # 1013: try again later
+            await websocket.close(code=1013)
+            return False
+        self.active_connections.add(websocket)
+        queue = asyncio.Queue(maxsize=_SEND_QUEUE_SIZE)
+        self._queues[websocket] = queue
+        self._senders[websocket] = asyncio.ensure_future(self._send_loop(websocket, queue))
+        return True
+
+    def disconnect(self, websocket: WebSocket):
+        self.active_connections.discard(websocket)
+        self._queues.pop(websocket, None)
+        sender = self._senders.pop(websocket, None)
+        if sender is not None and sender is not asyncio.current_task():
+            sender.cancel()
+
+    async def _send_loop(self, websocket: WebSocket, queue: asyncio.Queue):
+        """Deliver queued broadcasts; a failed send means the client is gone"""
+        try:
+            while True:
+                message = await queue.get()
+                await websocket.send_text(message)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            self.disconnect(websocket)
+
+    async def send_personal_message(self, message: str, websocket: WebSocket):
+        await websocket.send_text(message)
+
+    async def send_json_message(self, data: dict, websocket: WebSocket):
+        await websocket.send_text(json_dumps(data).decode())
+
+    async def broadcast(self, message: str):
+        for queue in list(self._queues.values()):
+            if queue.full():
+                # Drop the oldest so the client catches up with current state
+                queue.get_nowait()
+            queue.put_nowait(message)
+
+    async def broadcast_json(self, data: dict):
+        # Encoded once for every client
+        await self.broadcast(json_dumps(data).decode())
+
+manager = ConnectionManager()
@@ -4,10 +4,11 @@ ShellPilot Web Interface - FastAPI Backend
 
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import HTMLResponse
-from typing import List, Dict, Any, Optional
-import json
-import asyncio
+from fastapi.responses import HTMLResponse, JSONResponse, ORJSONResponse
+from typing import Dict, Any, Optional
+import functools
+import os
+import time
 import uvicorn
 from datetime import datetime
 
@@ -15,6 +16,10 @@ from datetime import datetime
 from shellpilot.config import get_config
 from shellpilot.core.session import get_session_store
 from shellpilot import __version__
+from shellpilot.utils.serialization import json_loads, orjson
+
+# WebSocket connections, shared with the API routers
+from .connections import manager
 
 # Import API routers
 from .api.commands import router as commands_router
@@ -27,7 +32,9 @@ app = FastAPI(
     description="AI-Powered Linux System Administration Web Interface",
     version=__version__,
     docs_url="/api/docs",
-    redoc_url="/api/redoc"
+    redoc_url="/api/redoc",
+    # Serialize responses with orjson when the optional 'fast' extra is installed
+    default_response_class=ORJSONResponse if orjson is not None else JSONResponse
 )
 
 # CORS middleware for frontend
@@ -44,29 +51,11 @@ app.include_router(commands_router, prefix="/api", tags=["commands"])
 app.include_router(workflows_router, prefix="/api", tags=["workflows"])
 app.include_router(session_router, prefix="/api", tags=["session"])
 
-# WebSocket connection manager
-class ConnectionManager:
-    def __init__(self):
-        self.active_connections: List[WebSocket] = []
-
-    async def connect(self, websocket: WebSocket):
-        await websocket.accept()
-        self.active_connections.append(websocket)
-
-    def disconnect(self, websocket: WebSocket):
-        self.active_connections.remove(websocket)
-
-    async def send_personal_message(self, message: str, websocket: WebSocket):
-        await websocket.send_text(message)
-
-    async def send_json_message(self, data: dict, websocket: WebSocket):
-        await websocket.send_text(json.dumps(data))
-
-    async def broadcast(self, message: str):
-        for connection in self.active_connections:
-            await connection.send_text(message)
-
-manager = ConnectionManager()
+# Close the providers' pooled async HTTP connections
+@app.on_event("shutdown")
+async def close_llm_clients():
+    from shellpilot.core.llm import aclose_providers
+    await aclose_providers()
 
 # Root endpoint
 @app.get("/")
@@ -80,7 +69,30 @@ async def root():
         "status": "running"
     }
 
+def cached_response(ttl: float, key=None):
+    """Reuse an argument-less endpoint's result for ttl seconds
+
+    For read-only endpoints that dashboards poll; never for per-session
+    or per-user data. If key is given, the cached result is also dropped
+    as soon as key() returns something different.
+    """
+    def decorator(func):
+        cached = None  # (expires_at, key, result)
+
+        @functools.wraps(func)
+        async def wrapper():
+            nonlocal cached
+            now = time.monotonic()
+            current_key = key() if key is not None else None
+            if cached is None or cached[0] <= now or cached[1] != current_key:
+                cached = (now + ttl, current_key, await func())
+            return cached[2]
+
+        return wrapper
+    return decorator
+
 # Health check endpoint
+# Not cached: it reports live session state, and is cheap to build
 @app.get("/api/health")
 async def health_check():
     """Health check endpoint"""
@@ -112,6 +124,7 @@ async def health_check():
 
 # Configuration endpoint
 @app.get("/api/config")
+@cached_response(ttl=5, key=lambda: get_config().get_revision())
 async def get_config_info():
     """Get current ShellPilot configuration"""
     try:
@@ -128,16 +141,31 @@ async def get_config_info():
     except Exception as e:
         raise HTTPException(status_code=500, detail=str(e))
 
+# Largest client message accepted on /ws; clients only send small JSON
+# control messages, so anything bigger is refused rather than parsed
+_WS_MAX_MESSAGE_SIZE = 64 * 1024
+
 # WebSocket endpoint for real-time communication
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
     """WebSocket endpoint for real-time command execution"""
-    await manager.connect(websocket)
+    if not await manager.connect(websocket):
+        return
     try:
         while True:
             # Wait for messages from client
             data = await websocket.receive_text()
-            message = json.loads(data)
+            if len(data) > _WS_MAX_MESSAGE_SIZE:
+                # 1009: message too big
+                await websocket.close(code=1009)
+                return
+            try:
+                message = json_loads(data)
+            except ValueError:
+                await manager.send_json_message(
+                    {"type": "error", "error": "Invalid JSON message"}, websocket
+                )
+                continue
 
             # Echo back for now (we'll implement command execution later)
             response = {
@@ -149,13 +177,14 @@ async def websocket_endpoint(websocket: WebSocket):
             await manager.send_json_message(response, websocket)
 
     except WebSocketDisconnect:
+        pass
+    finally:
+        # However the loop ends, release the client's slot, queue and sender
         manager.disconnect(websocket)
 
-# Simple web interface for testing
-@app.get("/test", response_class=HTMLResponse)
-async def test_interface():
-    """Simple test interface"""
-    return """
+# Simple web interface for testing. The page never changes, so it is
+# encoded once at import and browsers may keep it for an hour
+_TEST_PAGE = """
     <!DOCTYPE html>
     <html>
     <head>
@@ -232,13 +261,25 @@ async def test_interface():
         </script>
     </body>
     </html>
-    """
+    """.encode()
+
+@app.get("/test", response_class=HTMLResponse)
+async def test_interface():
+    """Simple test interface"""
+    return HTMLResponse(_TEST_PAGE, headers={"Cache-Control": "max-age=3600"})
 
 if __name__ == "__main__":
+    # loop and http stay "auto", which picks uvloop and httptools when
+    # uvicorn[standard] installed them. A single worker: background
+    # workflows, WebSocket clients and the session writer live in-process.
+    # The reloader's file watcher only runs with SHELLPILOT_DEV=1
     uvicorn.run(
         "shellpilot.web.main:app",
         host="0.0.0.0",
         port=8000,
-        reload=True,
-        log_level="info"
+        reload=os.getenv("SHELLPILOT_DEV") == "1",
+        log_level="info",
+        # Refuse oversized frames before they are buffered; the endpoint
+        # checks again for servers started without this
+        ws_max_size=_WS_MAX_MESSAGE_SIZE
     )
\ No newline at end of file